@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'drf_yasg',
     'rest_framework_simplejwt',
     # 'rest_framework_simplejwt.token_blacklist',
+    'helpers',
     'account',
     'posts',
     'booking',
@@ -110,6 +111,48 @@ DATABASES = {
 
 
 
+# Cache
+# Nearby search keeps a per-process snapshot of employee locations and uses
+# the cache to tell other processes what changed, so deployments running more
+# than one worker process need a shared backend (e.g. django.core.cache.backends.redis.RedisCache).
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache")
+
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+# Search employee locations in memory instead of querying the users table.
+# Needs a shared CACHE_BACKEND, so it defaults to off with the per-process
+# LocMemCache (check account.W001 warns when it is turned on with one).
+EMPLOYEE_LOCATION_SNAPSHOT = os.getenv(
+    "EMPLOYEE_LOCATION_SNAPSHOT", str(not CACHE_BACKEND.endswith("LocMemCache"))
+).lower() == "true"
+# Reload the snapshot from scratch at least this often (seconds), whatever the cache says
+EMPLOYEE_LOCATION_SNAPSHOT_MAX_AGE = int(os.getenv("EMPLOYEE_LOCATION_SNAPSHOT_MAX_AGE", "300"))
+
+
+# Background work (thumbnails, feed fan-out) runs on an in-process thread pool
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+BACKGROUND_TASKS_EAGER = os.getenv("BACKGROUND_TASKS_EAGER", "false").lower() == "true"
+
+# Booking event outbox (booking/events.py), drained by `manage.py drain_booking_events`
+BOOKING_EVENT_BATCH_SIZE = 100
+BOOKING_EVENT_MAX_ATTEMPTS = 10  # failing events are marked failed after this many tries
+BOOKING_EVENT_RETRY_SECONDS = 30  # first retry delay, doubled after every failure...
+BOOKING_EVENT_MAX_RETRY_SECONDS = 3600  # ...up to this
+BOOKING_EVENT_CLAIM_SECONDS = 600  # a claimed batch is retried after this if its worker died
+
+# Precomputed home feed (fan-out-on-write) for the all-posts endpoint
+FEED_ENGINE_ENABLED = os.getenv("FEED_ENGINE_ENABLED", "false").lower() == "true"
+FEED_MAX_ENTRIES = 500  # per user, older entries are evicted
+FEED_ACTIVE_DAYS = 7  # only users who read their feed this recently get pushed entries
+FEED_HOT_AUTHOR_DAILY_POSTS = 50  # authors posting more than this are read at request time instead
+FEED_FANOUT_BATCH_SIZE = 1000
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -146,9 +189,43 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-MEDIA_URL = "/media/"
+MEDIA_URL = os.getenv("MEDIA_URL", "/media/")
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Local media is served by helpers.media.serve_media. Set MEDIA_SENDFILE to
+# "nginx" (X-Accel-Redirect to an `internal` location at MEDIA_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or "sendfile" (X-Sendfile, Apache / lighttpd) to
+# let the proxy send the bytes; empty streams them from Django.
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Content-addressed media storage (helpers/storage.py): "local" or "s3"
+MEDIA_STORAGE = os.getenv("MEDIA_STORAGE", "local")
+MEDIA_S3_BUCKET = os.getenv("MEDIA_S3_BUCKET")
+MEDIA_S3_ENDPOINT_URL = os.getenv("MEDIA_S3_ENDPOINT_URL")  # e.g. a MinIO instance; unset for AWS
+MEDIA_S3_REGION = os.getenv("MEDIA_S3_REGION")
+# A blob reused by an upload isn't deleted for this long, while the new row
+# may still be committing; run `manage.py release_media_blobs` periodically
+MEDIA_RELEASE_GRACE_SECONDS = int(os.getenv("MEDIA_RELEASE_GRACE_SECONDS", "900"))
+STORAGES = {
+    "default": {
+        "BACKEND": {
+            "local": "helpers.storage.HashedFileSystemStorage",
+            "s3": "helpers.storage.HashedS3Storage",
+        }[MEDIA_STORAGE],
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+
+# Post uploads: hard size cap for both the multipart and the chunked path
+POST_UPLOAD_MAX_BYTES = int(os.getenv("POST_UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_CHUNK_MAX_BYTES = 8 * 1024 * 1024
+# Partially uploaded files of resumable sessions; must be shared by all app servers
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(BASE_DIR, "media_uploads"))
+UPLOAD_SESSION_TTL_HOURS = 24
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
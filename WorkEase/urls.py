@@ -1,10 +1,10 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from django.conf import settings
-from django.conf.urls.static import static
+from helpers.media import serve_media
 
 # Swagger schema view setup
 schema_view = get_schema_view(
@@ -31,7 +31,11 @@ urlpatterns = [
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Local media only; with the S3 backend MEDIA_URL points at the bucket / CDN
+if settings.MEDIA_URL.startswith('/'):
+    urlpatterns += [
+        re_path(r'^%s/(?P<path>.+)$' % settings.MEDIA_URL.strip('/'), serve_media, name='media'),
+    ]
 
 
 
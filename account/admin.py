@@ -32,6 +32,6 @@ class UserAdmin(BaseUserAdmin):
 # --------- EmployeeProfile Admin ---------
 @admin.register(EmployeeProfile)
 class EmployeeProfileAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'title', 'experience', 'hourly_rate', 'available')
+    list_display = ('id', 'user', 'title', 'experience', 'hourly_rate', 'available', 'average_rating', 'rating_count')
     search_fields = ('user__full_name', 'title')
     list_filter = ('available',)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register()
+def location_snapshot_cache(app_configs, **kwargs):
+    """The location snapshot learns about other processes' writes through the cache."""
+    if settings.EMPLOYEE_LOCATION_SNAPSHOT and settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            "EMPLOYEE_LOCATION_SNAPSHOT is on but the default cache is per process.",
+            hint="Other worker processes only see location changes after EMPLOYEE_LOCATION_SNAPSHOT_MAX_AGE. "
+                 "Use a shared CACHE_BACKEND (e.g. Redis) or turn the snapshot off.",
+            id="account.W001",
+        )]
+    return []
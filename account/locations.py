@@ -0,0 +1,164 @@
+import threading
+import time
+from functools import reduce
+from operator import or_
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, FloatField
+from django.db.models.functions import Cast
+
+from helpers.distance import nearest
+from helpers.geo import bounding_box, geohash_cells
+from .models import User
+
+VERSION_KEY = "employee_locations:version"
+CHANGE_KEY = "employee_locations:change:{}"
+CHANGE_TTL = 60 * 60
+MAX_INCREMENTAL_CHANGES = 500
+
+
+def employees_within_box(queryset, lat, lon, radius_km):
+    """
+    Narrow an employee `User` queryset to the geohash cells and lat/lon box
+    around (lat, lon). Rows in the corners of the box still need an exact
+    distance check.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    cells = geohash_cells(min_lat, max_lat, min_lon, max_lon)
+    queryset = queryset.filter(
+        reduce(or_, (Q(geohash__startswith=cell) for cell in cells)),
+        role="employee",
+        latitude__range=(min_lat, max_lat),
+    )
+    if min_lon <= max_lon:
+        return queryset.filter(longitude__range=(min_lon, max_lon))
+    # Box wraps around the antimeridian
+    return queryset.filter(Q(longitude__gte=min_lon) | Q(longitude__lte=max_lon))
+
+
+def employee_location_rows(queryset):
+    return queryset.filter(role="employee").values_list(
+        "id",
+        Cast("latitude", FloatField()),
+        Cast("longitude", FloatField()),
+        "employee_profile__available",
+    )
+
+
+class EmployeeLocationSnapshot:
+    """
+    Per-process copy of every employee's (lat, lon, available) in flat NumPy
+    arrays, so radius searches never touch the database.
+
+    Writers bump a version counter in the cache and record which user changed
+    under that version (see `employee_location_changed`). Before each search
+    the snapshot compares versions and re-reads only the changed users; it is
+    rebuilt from scratch on first use, when the change log is gone, and after
+    EMPLOYEE_LOCATION_SNAPSHOT_MAX_AGE seconds in case a change was missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.loaded_at = 0.0  # time.monotonic() of the last full load
+        self.version = 0
+        self.ids = np.empty(0, dtype=np.int64)
+        self.lats = np.empty(0, dtype=np.float64)
+        self.lons = np.empty(0, dtype=np.float64)
+        self.available = np.empty(0, dtype=bool)
+        self._positions = {}  # user id -> index into the arrays
+
+    def load(self):
+        version = cache.get(VERSION_KEY, 0)
+        rows = list(employee_location_rows(User.objects.all()))
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.lats = np.array([row[1] for row in rows], dtype=np.float64)  # None -> NaN
+        self.lons = np.array([row[2] for row in rows], dtype=np.float64)
+        self.available = np.array([bool(row[3]) for row in rows], dtype=bool)
+        self._positions = {user_id: i for i, user_id in enumerate(self.ids.tolist())}
+        self.version = version
+        self.loaded = True
+        self.loaded_at = time.monotonic()
+
+    def refresh(self, user_ids):
+        """Re-read only `user_ids` and patch them into the arrays in place."""
+        rows = {row[0]: row for row in employee_location_rows(User.objects.filter(id__in=user_ids))}
+        new_rows = []
+        for user_id in user_ids:
+            row = rows.get(user_id)
+            position = self._positions.get(user_id)
+            if position is None:
+                if row is not None:
+                    new_rows.append(row)
+                continue
+            if row is None:
+                # Deleted or no longer an employee: leave a tombstone
+                self.lats[position] = np.nan
+                self.lons[position] = np.nan
+                self.available[position] = False
+            else:
+                self.lats[position] = np.nan if row[1] is None else row[1]
+                self.lons[position] = np.nan if row[2] is None else row[2]
+                self.available[position] = bool(row[3])
+
+        if new_rows:
+            start = len(self.ids)
+            self.ids = np.append(self.ids, [row[0] for row in new_rows])
+            self.lats = np.append(self.lats, np.array([row[1] for row in new_rows], dtype=np.float64))
+            self.lons = np.append(self.lons, np.array([row[2] for row in new_rows], dtype=np.float64))
+            self.available = np.append(self.available, [bool(row[3]) for row in new_rows])
+            for offset, row in enumerate(new_rows):
+                self._positions[row[0]] = start + offset
+
+    def sync(self):
+        with self._lock:
+            if not self.loaded or time.monotonic() - self.loaded_at > settings.EMPLOYEE_LOCATION_SNAPSHOT_MAX_AGE:
+                self.load()
+                return
+
+            current = cache.get(VERSION_KEY, 0)
+            if current == self.version:
+                return
+
+            pending = current - self.version
+            if pending < 0 or pending > MAX_INCREMENTAL_CHANGES:
+                self.load()
+                return
+
+            keys = [CHANGE_KEY.format(v) for v in range(self.version + 1, current + 1)]
+            changes = cache.get_many(keys)
+            if len(changes) < len(keys):
+                # Part of the change log expired, incremental refresh is unsafe
+                self.load()
+                return
+
+            self.refresh(set(changes.values()))
+            self.version = current
+
+    def search(self, lat, lon, radius_km, limit, available_only=False, user_ids=None):
+        """
+        (user ids, distances in km) of employees within `radius_km`, nearest
+        first, optionally restricted to `user_ids`.
+        """
+        self.sync()
+        with self._lock:
+            ids, lats, lons, available = self.ids, self.lats, self.lons, self.available
+        mask = available.copy() if available_only else np.ones(ids.size, dtype=bool)
+        if user_ids is not None:
+            mask &= np.isin(ids, np.fromiter(user_ids, dtype=np.int64))
+        ids, lats, lons = ids[mask], lats[mask], lons[mask]
+
+        positions, distances = nearest(lat, lon, lats, lons, radius_km=radius_km, k=limit)
+        return ids[positions].tolist(), distances.tolist()
+
+
+employee_locations = EmployeeLocationSnapshot()
+
+
+def employee_location_changed(user_id):
+    """Record that `user_id`'s location or availability changed."""
+    cache.add(VERSION_KEY, 0, timeout=None)
+    version = cache.incr(VERSION_KEY)
+    cache.set(CHANGE_KEY.format(version), user_id, CHANGE_TTL)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from account.models import User
+from helpers.geo import encode_geohash
+
+
+class Command(BaseCommand):
+    help = "Backfill the geohash cell of users that have coordinates, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Recompute every user instead of only those with an empty geohash.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        users = User.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        if not options["all"]:
+            users = users.filter(geohash__isnull=True)
+        users = users.only("id", "latitude", "longitude", "geohash").order_by("pk")
+
+        updated = 0
+        last_pk = 0
+        while True:
+            # keyset over pk so each batch is an index range scan
+            batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for user in batch:
+                user.geohash = encode_geohash(float(user.latitude), float(user.longitude))
+            User.objects.bulk_update(batch, ["geohash"])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f"Updated {updated} users...")
+
+        self.stdout.write(self.style.SUCCESS(f"Geohash backfill complete: {updated} users updated."))
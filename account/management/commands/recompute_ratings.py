@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from account.models import EmployeeProfile
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rating aggregates of every employee profile from their reviews."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = EmployeeProfile.objects.recompute_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed ratings for {updated} employee profiles."))
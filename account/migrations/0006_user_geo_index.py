@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0005_user_latitude_user_longitude'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'latitude', 'longitude'], name='account_user_geo_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0006_user_geo_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'geohash'], name='account_user_geohash_idx', opclasses=['varchar_pattern_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:35
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    EmployeeProfile = apps.get_model('account', 'EmployeeProfile')
+    EmployeeReview = apps.get_model('account', 'EmployeeReview')
+
+    reviews = EmployeeReview.objects.filter(employee=OuterRef('user')).order_by().values('employee')
+    EmployeeProfile.objects.update(
+        rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+        rating_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+    )
+    EmployeeProfile.objects.update(
+        average_rating=Case(
+            When(rating_count__gt=0, then=Round(
+                Cast(F('rating_sum'), models.FloatField()) / F('rating_count'), 2
+            )),
+            default=Value(Decimal('0')),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0007_user_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='average_rating',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='employeeprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprofile',
+            index=models.Index(fields=['-average_rating'], name='account_emp_rating_idx'),
+        ),
+        migrations.RunPython(fill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+INDEX_NAME = 'account_emp_skills_gin'
+
+
+def create_skills_index(apps, schema_editor):
+    # jsonb containment index, Postgres only (SQLite test databases skip it)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON account_employeeprofile USING gin (skills jsonb_path_ops)'
+    )
+
+
+def drop_skills_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_employeeprofile_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_skills_index, drop_skills_index),
+    ]
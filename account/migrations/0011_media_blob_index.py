@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='profile_image',
+            field=models.ImageField(blank=True, db_index=True, null=True, upload_to='profile_images/'),
+        ),
+    ]
@@ -3,6 +3,11 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import transaction
+from django.db.models import F, Case, When, Value, Count, Sum, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce, Round
+from decimal import Decimal
+from helpers.geo import encode_geohash
 
 
 # --------- Custom User Manager ---------
@@ -51,8 +56,13 @@ class User(AbstractUser):
         max_digits=9, decimal_places=6, blank=True, null=True,
         help_text="Longitude (e.g. 76.2144)"
     )
+    # Precomputed from latitude/longitude in save(), used for prefix (cell) lookups
+    geohash = models.CharField(max_length=12, blank=True, null=True, editable=False)
     location = models.CharField(max_length=255, blank=True, null=True)
-    profile_image = models.ImageField(upload_to='profile_images/', blank=True, null=True)
+    # indexed: shared (content-addressed) blobs are only deleted once unreferenced, see helpers/storage.py
+    profile_image = models.ImageField(upload_to='profile_images/', blank=True, null=True, db_index=True)
+    # Resized renditions of profile_image, filled in the background (helpers/images.py)
+    profile_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     otp = models.CharField(max_length=6, blank=True, null=True)
     is_verified = models.BooleanField(default=False)
 
@@ -61,9 +71,65 @@ class User(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # bounding-box prefilter for nearby employee search
+            models.Index(fields=['role', 'latitude', 'longitude'], name='account_user_geo_idx'),
+            # pattern ops so `geohash LIKE 'abc%'` can use the index on Postgres
+            models.Index(
+                fields=['role', 'geohash'], name='account_user_geohash_idx',
+                opclasses=['varchar_pattern_ops', 'varchar_pattern_ops'],
+            ),
+        ]
+
     def __str__(self):
         return f"{self.full_name} ({self.email})"
 
+    def save(self, *args, **kwargs):
+        # Keep the geohash cell in sync whenever coordinates change
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(float(self.latitude), float(self.longitude))
+        else:
+            self.geohash = None
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+
+
+
+# --------- Employee Profile QuerySet ---------
+class EmployeeProfileQuerySet(models.QuerySet):
+    def apply_rating_delta(self, sum_delta, count_delta):
+        """
+        Shift the stored rating aggregates in a single UPDATE. F() expressions
+        are evaluated against the row's current values, so concurrent reviews
+        for the same employee cannot overwrite each other.
+        """
+        new_sum = F('rating_sum') + sum_delta
+        new_count = F('rating_count') + count_delta
+        return self.update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            average_rating=Case(
+                When(rating_count__gt=-count_delta, then=Round(
+                    Cast(new_sum, models.FloatField()) / new_count, 2
+                )),
+                default=Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=3, decimal_places=2),
+            ),
+        )
+
+    def recompute_ratings(self):
+        """Rebuild the rating aggregates from EmployeeReview rows (repair path)."""
+        reviews = EmployeeReview.objects.filter(employee=OuterRef('user')).order_by().values('employee')
+        self.update(
+            rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+            rating_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+        )
+        return self.apply_rating_delta(0, 0)
+
 
 
 # --------- Employee Profile ---------
@@ -74,16 +140,29 @@ class EmployeeProfile(models.Model):
     hourly_rate = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     available = models.BooleanField(default=True)
     bio = models.TextField(blank=True, null=True)
-    skills = models.JSONField(default=list, blank=True) 
+    skills = models.JSONField(default=list, blank=True)  # GIN indexed on Postgres (migration 0009)
+    # Rating aggregates, maintained by EmployeeReview signals (see account/signals.py)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, editable=False)
+
+    objects = EmployeeProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-average_rating'], name='account_emp_rating_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.full_name} - {self.title or 'No Title'}"
-    
-    @property
-    def average_rating(self):
-        from django.db.models import Avg
-        result = self.user.employee_ratings.aggregate(avg_rating=Avg('rating'))
-        return round(result['avg_rating'] or 0, 2)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored skills so the facet cache is only dropped when they change
+        skills = instance.__dict__.get('skills')
+        instance._loaded_skills = list(skills) if isinstance(skills, list) else skills
+        return instance
     
 
 # --------- Employee Review (Client → Employee) ---------
@@ -111,6 +190,25 @@ class EmployeeReview(models.Model):
 
     def __str__(self):
         return f"{self.client.full_name} → {self.employee.full_name} ({self.rating})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored values so the rating signal can apply a delta on update
+        instance._loaded_rating = getattr(instance, 'rating', None)
+        instance._loaded_employee_id = getattr(instance, 'employee_id', None)
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Keep the review row and the profile aggregates in one transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_rating = self.rating
+        self._loaded_employee_id = self.employee_id
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
     
     
 
@@ -5,6 +5,8 @@ from django.contrib.auth import authenticate
 import re
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import password_validation
+from helpers.images import ImageVariantField
+from helpers.serializers import SubmittedFieldsUpdateMixin
 
 #-------------Register Serializer ---------------------
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -217,33 +219,40 @@ class ChangePasswordSerializer(serializers.Serializer):
     
 
 # ----------- User Profile Serializer -----------
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SubmittedFieldsUpdateMixin, serializers.ModelSerializer):
+    # saves only what was sent: profile_image_variants is written in the background
+    profile_image_variant = ImageVariantField('profile_image', variant='full')
+
     class Meta:
         model = User
         fields = [
             'id', 'email', 'full_name', 'role',
-            'phone', 'location', 'latitude' , 'longitude' ,  'profile_image', 'is_verified'
+            'phone', 'location', 'latitude' , 'longitude' ,  'profile_image', 'profile_image_variant', 'is_verified'
         ]
         read_only_fields = ['email', 'role', 'is_verified']
 
 
 #---------- Employee Profle Get the Employee Register Data -------
 class UserMiniSerializer(serializers.ModelSerializer):
+    profile_image_variant = ImageVariantField('profile_image', variant='thumb')
+
     class Meta:
         model = User
-        fields = ['id', 'full_name', 'email', 'phone', 'location', 'profile_image']
+        fields = ['id', 'full_name', 'email', 'phone', 'location', 'profile_image', 'profile_image_variant']
 
 
 # ----------- Employee Profile Serializer -----------
-class EmployeeProfileSerializer(serializers.ModelSerializer):
+class EmployeeProfileSerializer(SubmittedFieldsUpdateMixin, serializers.ModelSerializer):
+    # saves only what was sent: the rating aggregates are kept by account/signals.py
     user = UserMiniSerializer(read_only=True) 
     average_rating = serializers.FloatField(read_only=True)
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
 
     class Meta:
         model = EmployeeProfile
         fields = [
             'id', 'title', 'skills', 'experience',
-            'hourly_rate', 'available', 'bio', 'average_rating', 'user', 
+            'hourly_rate', 'available', 'bio', 'average_rating', 'review_count', 'user', 
         ]
   
     
@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from helpers.images import schedule_variants
+from helpers.storage import remember_media, release_media
+from .models import User, EmployeeProfile, EmployeeReview
+from .locations import employee_location_changed
+from .skills import invalidate_skill_facet
+
+LOCATION_FIELDS = {"latitude", "longitude", "role"}
+
+
+# ---------- Employee location snapshot invalidation ----------
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not LOCATION_FIELDS & set(update_fields):
+        return  # e.g. last_login / otp updates
+    if created and instance.role != "employee":
+        return
+    transaction.on_commit(lambda: employee_location_changed(instance.pk))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    if instance.role == "employee":
+        transaction.on_commit(lambda: employee_location_changed(instance.pk))
+
+
+@receiver(post_save, sender=EmployeeProfile)
+@receiver(post_delete, sender=EmployeeProfile)
+def employee_profile_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: employee_location_changed(instance.user_id))
+
+
+# ---------- Skill facet cache ----------
+@receiver(post_save, sender=EmployeeProfile)
+def employee_profile_skills_saved(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and "skills" not in update_fields:
+        return
+    if created or instance.__dict__.get("_loaded_skills") != instance.skills:
+        transaction.on_commit(invalidate_skill_facet)
+    instance._loaded_skills = list(instance.skills) if isinstance(instance.skills, list) else instance.skills
+
+
+@receiver(post_delete, sender=EmployeeProfile)
+def employee_profile_skills_deleted(sender, instance, **kwargs):
+    if instance.skills:
+        transaction.on_commit(invalidate_skill_facet)
+
+
+# ---------- Profile image variants ----------
+@receiver(post_save, sender=User)
+def user_image_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "profile_image" in update_fields:
+        schedule_variants(instance, "profile_image")
+
+
+# ---------- Media blob cleanup ----------
+@receiver(pre_save, sender=User)
+def user_image_saving(sender, instance, update_fields=None, **kwargs):
+    remember_media(instance, "profile_image", update_fields)
+
+
+@receiver(post_save, sender=User)
+def user_image_replaced(sender, instance, **kwargs):
+    release_media(instance, "profile_image")
+
+
+@receiver(post_delete, sender=User)
+def user_image_deleted(sender, instance, **kwargs):
+    release_media(instance, "profile_image", deleted=True)
+
+
+# ---------- Employee rating aggregates ----------
+@receiver(post_save, sender=EmployeeReview)
+def review_saved(sender, instance, created, **kwargs):
+    old_employee_id = getattr(instance, "_loaded_employee_id", None)
+    old_rating = getattr(instance, "_loaded_rating", None)
+
+    if created or old_employee_id is None:
+        EmployeeProfile.objects.filter(user_id=instance.employee_id).apply_rating_delta(instance.rating, 1)
+    elif old_employee_id != instance.employee_id:
+        EmployeeProfile.objects.filter(user_id=old_employee_id).apply_rating_delta(-old_rating, -1)
+        EmployeeProfile.objects.filter(user_id=instance.employee_id).apply_rating_delta(instance.rating, 1)
+    elif old_rating != instance.rating:
+        EmployeeProfile.objects.filter(user_id=instance.employee_id).apply_rating_delta(
+            instance.rating - old_rating, 0
+        )
+
+
+@receiver(post_delete, sender=EmployeeReview)
+def review_deleted(sender, instance, **kwargs):
+    EmployeeProfile.objects.filter(user_id=instance.employee_id).apply_rating_delta(-instance.rating, -1)
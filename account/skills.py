@@ -0,0 +1,71 @@
+import json
+
+from django.core.cache import cache
+from django.db import connections
+
+from .models import EmployeeProfile
+
+SKILL_FACET_KEY = "employee_skills:facet"
+SKILL_FACET_TTL = 60 * 60
+
+
+def parse_skills(value):
+    """Comma separated `skills` query param -> list of skill names."""
+    return [skill.strip() for skill in (value or "").split(",") if skill.strip()]
+
+
+def filter_by_skills(queryset, skills, prefix=""):
+    """
+    Keep rows whose skills list contains every skill in `skills`.
+
+    On Postgres this is a jsonb containment (@>) query served by the GIN index
+    on EmployeeProfile.skills. Other backends have no JSON containment, so as a
+    test-only fallback each skill is matched against the stored JSON text.
+    """
+    if not skills:
+        return queryset
+    lookup = f"{prefix}skills"
+    if connections[queryset.db].vendor == "postgresql":
+        return queryset.filter(**{f"{lookup}__contains": skills})
+    for skill in skills:
+        queryset = queryset.filter(**{f"{lookup}__icontains": json.dumps(skill)})
+    return queryset
+
+
+# Skill -> number of profiles listing it, counted by the database from the
+# JSON arrays. Rows whose skills aren't a list count as having none.
+SKILL_FACET_SQL = {
+    "postgresql": """
+        SELECT skill, COUNT(DISTINCT p.id) AS profiles
+        FROM {table} p
+        CROSS JOIN LATERAL jsonb_array_elements_text(
+            CASE WHEN jsonb_typeof(p.skills) = 'array' THEN p.skills ELSE '[]'::jsonb END
+        ) AS skill
+        GROUP BY skill
+        ORDER BY profiles DESC, skill
+    """,
+    # SQLite (tests)
+    "sqlite": """
+        SELECT j.value, COUNT(DISTINCT p.id) AS profiles
+        FROM {table} p, json_each(CASE WHEN json_type(p.skills) = 'array' THEN p.skills ELSE '[]' END) j
+        GROUP BY j.value
+        ORDER BY profiles DESC, j.value
+    """,
+}
+
+
+def skill_facet():
+    """[{"skill", "count"}] over all employee profiles, most common first. Cached."""
+    facet = cache.get(SKILL_FACET_KEY)
+    if facet is None:
+        connection = connections[EmployeeProfile.objects.db]
+        sql = SKILL_FACET_SQL[connection.vendor].format(table=connection.ops.quote_name(EmployeeProfile._meta.db_table))
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            facet = [{"skill": skill, "count": count} for skill, count in cursor.fetchall()]
+        cache.set(SKILL_FACET_KEY, facet, SKILL_FACET_TTL)
+    return facet
+
+
+def invalidate_skill_facet():
+    cache.delete(SKILL_FACET_KEY)
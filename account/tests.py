@@ -1,3 +1,277 @@
-from django.test import TestCase
+from decimal import Decimal
+from math import cos, degrees, radians, sin
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from helpers.geo import EARTH_RADIUS_KM, bounding_box, calculate_distance, encode_geohash, geohash_cells
+from .checks import location_snapshot_cache
+from .locations import CHANGE_KEY, VERSION_KEY, EmployeeLocationSnapshot, employees_within_box
+from .models import EmployeeProfile, EmployeeReview, User
+from .skills import SKILL_FACET_KEY, skill_facet
+
+
+def point_at(lat, lon, distance_km, bearing_degrees):
+    """Rough point `distance_km` away from (lat, lon); fine for the small distances used here."""
+    angular = degrees(distance_km / EARTH_RADIUS_KM)
+    lon = lon + angular * sin(radians(bearing_degrees)) / cos(radians(lat))
+    lon = (lon + 180) % 360 - 180
+    return lat + angular * cos(radians(bearing_degrees)), lon
+
+
+# ---------- Geohash cell cover ----------
+class GeohashCoverTests(TestCase):
+    """Every point within the radius must fall in one of the searched cells."""
+
+    def assertCovered(self, lat, lon, radius_km):
+        cells = geohash_cells(*bounding_box(lat, lon, radius_km))
+        for bearing in range(0, 360, 15):
+            for fraction in (0.5, 0.99):
+                point = point_at(lat, lon, radius_km * fraction, bearing)
+                if calculate_distance(lat, lon, *point) > radius_km:
+                    continue
+                geohash = encode_geohash(*point)
+                self.assertTrue(
+                    any(geohash.startswith(cell) for cell in cells),
+                    f"{point} ({geohash}) outside cells {cells} around {(lat, lon)}",
+                )
+
+    def test_points_across_cell_edges(self):
+        # the equator and prime meridian split every geohash level
+        self.assertCovered(0.0001, 0.0001, 1)
+        self.assertCovered(-0.0001, -0.0001, 5)
+        # a point just inside a precision-5 cell edge, small radius
+        self.assertCovered(10.0195, 76.0, 0.5)
+        self.assertCovered(10.5276, 76.2144, 50)
+
+    def test_points_across_the_antimeridian(self):
+        self.assertCovered(10.0, 179.999, 5)
+        self.assertCovered(-40.0, -179.999, 20)
+
+
+class EmployeesWithinBoxTests(TestCase):
+    def employee(self, lat, lon):
+        return User.objects.create_user(
+            email=f"e{lat}_{lon}@example.com", password="pass1234", full_name="Employee",
+            role="employee", latitude=f"{lat:.6f}", longitude=f"{lon:.6f}",
+        )
+
+    def found(self, lat, lon, radius_km):
+        return set(employees_within_box(User.objects.all(), lat, lon, radius_km).values_list("id", flat=True))
+
+    def test_neighbour_cell_at_the_equator_and_meridian(self):
+        near = self.employee(-0.0005, -0.0005)
+        self.employee(0.5, 0.5)
+        self.assertEqual(self.found(0.0005, 0.0005, 1), {near.id})
+
+    def test_wraps_around_the_antimeridian(self):
+        east = self.employee(10.0, 179.995)
+        west = self.employee(10.0, -179.995)
+        self.employee(10.0, 170.0)
+        self.assertEqual(self.found(10.0, 179.999, 5), {east.id, west.id})
+        self.assertEqual(self.found(10.0, -179.999, 5), {east.id, west.id})
+
+    def test_clients_are_ignored(self):
+        User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client",
+            role="client", latitude="10.000000", longitude="76.000000",
+        )
+        self.assertEqual(self.found(10.0, 76.0, 5), set())
+
+
+# ---------- Location snapshot ----------
+class EmployeeLocationSnapshotTests(TestCase):
+    def setUp(self):
+        cache.delete(VERSION_KEY)
+        self.snapshot = EmployeeLocationSnapshot()
+
+    def employee(self, email, lat, lon):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create_user(
+                email=email, password="pass1234", full_name="Employee",
+                role="employee", latitude=lat, longitude=lon,
+            )
+            EmployeeProfile.objects.create(user=user, hourly_rate=100)
+        return user
+
+    def search(self):
+        ids, _ = self.snapshot.search(10.0, 76.0, 10, 50)
+        return ids
+
+    def test_changes_are_patched_in_without_a_full_reload(self):
+        moving = self.employee("moving@example.com", "10.000000", "76.000000")
+        staying = self.employee("staying@example.com", "10.010000", "76.000000")
+        self.assertEqual(self.search(), [moving.id, staying.id])
+
+        with mock.patch.object(self.snapshot, "load", wraps=self.snapshot.load) as load:
+            with self.captureOnCommitCallbacks(execute=True):
+                moving.latitude, moving.longitude = "20.000000", "80.000000"
+                moving.save(update_fields=["latitude", "longitude"])
+            new = self.employee("new@example.com", "10.001000", "76.000000")
+            self.assertEqual(self.search(), [new.id, staying.id])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                staying.role = "client"
+                staying.save(update_fields=["role"])
+            self.assertEqual(self.search(), [new.id])
+        load.assert_not_called()
+        self.assertEqual(self.snapshot.version, cache.get(VERSION_KEY))
+
+    def test_unrelated_saves_do_not_bump_the_version(self):
+        user = self.employee("employee@example.com", "10.000000", "76.000000")
+        version = cache.get(VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.otp = "123456"
+            user.save(update_fields=["otp"])
+        self.assertEqual(cache.get(VERSION_KEY), version)
+
+    @override_settings(EMPLOYEE_LOCATION_SNAPSHOT_MAX_AGE=60)
+    def test_old_snapshot_is_reloaded(self):
+        # another process's change this one never heard of (per-process cache)
+        self.search()
+        with mock.patch.object(self.snapshot, "load", wraps=self.snapshot.load) as load:
+            self.search()
+            load.assert_not_called()
+            self.snapshot.loaded_at -= 61
+            self.search()
+        load.assert_called_once()
+
+    def test_per_process_cache_is_flagged(self):
+        local = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        shared = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache"}}
+        with self.settings(EMPLOYEE_LOCATION_SNAPSHOT=True, CACHES=local):
+            self.assertEqual([check.id for check in location_snapshot_cache(None)], ["account.W001"])
+        with self.settings(EMPLOYEE_LOCATION_SNAPSHOT=True, CACHES=shared):
+            self.assertEqual(location_snapshot_cache(None), [])
+        with self.settings(EMPLOYEE_LOCATION_SNAPSHOT=False, CACHES=local):
+            self.assertEqual(location_snapshot_cache(None), [])
+
+    def test_expired_change_log_forces_a_reload(self):
+        self.employee("first@example.com", "10.000000", "76.000000")
+        self.search()
+        second = self.employee("second@example.com", "10.001000", "76.000000")
+        cache.delete(CHANGE_KEY.format(cache.get(VERSION_KEY)))
+
+        with mock.patch.object(self.snapshot, "load", wraps=self.snapshot.load) as load:
+            self.assertIn(second.id, self.search())
+        load.assert_called_once()
+
+
+# ---------- Skill facet ----------
+class SkillFacetTests(TestCase):
+    def setUp(self):
+        cache.delete(SKILL_FACET_KEY)
+
+    def profile(self, email, skills):
+        user = User.objects.create_user(email=email, password="pass1234", full_name="Employee", role="employee")
+        with self.captureOnCommitCallbacks(execute=True):
+            return EmployeeProfile.objects.create(user=user, skills=skills)
+
+    def test_counts_each_profile_once(self):
+        self.profile("a@example.com", ["plumbing", "wiring", "plumbing"])
+        self.profile("b@example.com", ["wiring"])
+        self.profile("c@example.com", "not a list")
+        self.assertEqual(skill_facet(), [{"skill": "wiring", "count": 2}, {"skill": "plumbing", "count": 1}])
+
+    def test_cache_dropped_only_when_skills_change(self):
+        profile = self.profile("a@example.com", ["wiring"])
+        skill_facet()
+        profile = EmployeeProfile.objects.get(pk=profile.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.bio = "Twenty years of experience"
+            profile.save()
+        self.assertIsNotNone(cache.get(SKILL_FACET_KEY))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.skills.append("plumbing")
+            profile.save()
+        self.assertIsNone(cache.get(SKILL_FACET_KEY))
+
+
+# ---------- Rating aggregates ----------
+class RatingAggregateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = []
+        for email in ("e1@example.com", "e2@example.com"):
+            user = User.objects.create_user(email=email, password="pass1234", full_name="Employee", role="employee")
+            EmployeeProfile.objects.create(user=user)
+            cls.employees.append(user)
+        cls.clients = [
+            User.objects.create_user(email=email, password="pass1234", full_name="Client", role="client")
+            for email in ("c1@example.com", "c2@example.com")
+        ]
+
+    def aggregates(self, employee):
+        profile = EmployeeProfile.objects.get(user=employee)
+        return profile.rating_sum, profile.rating_count, profile.average_rating
+
+    def test_create_update_and_delete(self):
+        first, second = self.employees
+        review = EmployeeReview.objects.create(employee=first, client=self.clients[0], rating=4)
+        EmployeeReview.objects.create(employee=first, client=self.clients[1], rating=5)
+        self.assertEqual(self.aggregates(first), (9, 2, Decimal("4.50")))
+
+        review.rating = 1
+        review.save()
+        self.assertEqual(self.aggregates(first), (6, 2, Decimal("3.00")))
+
+        # a review moved to another employee leaves the first one
+        review = EmployeeReview.objects.get(pk=review.pk)
+        review.employee = second
+        review.save()
+        self.assertEqual(self.aggregates(first), (5, 1, Decimal("5.00")))
+        self.assertEqual(self.aggregates(second), (1, 1, Decimal("1.00")))
+
+        review.delete()
+        self.assertEqual(self.aggregates(second), (0, 0, Decimal("0")))
+
+    def test_recompute_matches_the_deltas(self):
+        employee = self.employees[0]
+        for client, rating in zip(self.clients, (2, 3)):
+            EmployeeReview.objects.create(employee=employee, client=client, rating=rating)
+        expected = self.aggregates(employee)
+
+        EmployeeProfile.objects.update(rating_sum=0, rating_count=0, average_rating=0)
+        EmployeeProfile.objects.recompute_ratings()
+        self.assertEqual(self.aggregates(employee), expected)
+
+
+# ---------- Profile edits ----------
+class ProfileUpdateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="a@example.com", password="pass1234", full_name="User", role="client")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def test_edit_keeps_background_columns(self):
+        # a variant job finishing while the request is in flight
+        User.objects.filter(pk=self.user.pk).update(profile_image_variants={"full": "profiles/full.webp"})
+
+        response = self.api.put("/api/user/profile/", {"full_name": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(user.full_name, "Renamed")
+        self.assertEqual(user.profile_image_variants, {"full": "profiles/full.webp"})
+
+    def test_employee_edit_keeps_rating_aggregates(self):
+        employee = User.objects.create_user(email="e@example.com", password="pass1234", full_name="Employee", role="employee")
+        EmployeeProfile.objects.create(user=employee)
+        # a review landing while the request is in flight
+        EmployeeProfile.objects.filter(user=employee).apply_rating_delta(4, 1)
+        self.api.force_authenticate(employee)
+
+        response = self.api.put("/api/employee/profile/", {"bio": "Twenty years of experience"}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+        profile = EmployeeProfile.objects.get(user=employee)
+        self.assertEqual(profile.bio, "Twenty years of experience")
+        self.assertEqual((profile.rating_sum, profile.rating_count, profile.average_rating), (4, 1, 4))
+
+    def test_plain_save_of_a_deleted_row_inserts_it(self):
+        user = User.objects.get(pk=self.user.pk)
+        User.objects.filter(pk=user.pk).delete()
+        user.save()
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
@@ -308,7 +308,7 @@ class ResetPasswordView(APIView):
             user = User.objects.get(email=email)
             user.set_password(new_password)
             user.otp = None
-            user.save()
+            user.save(update_fields=['password', 'otp'])
             return Response({"msg": "Password reset successfully"}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -342,7 +342,7 @@ class ChangePasswordView(APIView):
 
             # Set and save new password
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=['password'])
 
             return Response(
                 {"msg": "Password changed successfully"},
@@ -1,5 +1,23 @@
-from django.contrib import admin
-from .models import Booking
+from django.contrib import admin, messages
+from .models import Booking, WorkingHours, AvailabilityException
+from .transitions import bookings_for_transition, bulk_transition
+
+
+def transition_action(target, description):
+    """Admin action moving the selected bookings to `target` through the state machine."""
+    def action(modeladmin, request, queryset):
+        items = [{"book_id": book_id, "status": target} for book_id in queryset.values_list("book_id", flat=True)]
+        results = bulk_transition(items, bookings_for_transition())
+        moved = sum(result["ok"] for result in results)
+        modeladmin.message_user(request, f"{moved} booking(s) marked {target}.", messages.SUCCESS)
+        if moved < len(results):
+            modeladmin.message_user(
+                request, f"{len(results) - moved} booking(s) skipped: {target} is not allowed from their status.",
+                messages.WARNING,
+            )
+    action.__name__ = f"mark_{target.lower()}"
+    action.short_description = description
+    return action
 
 
 @admin.register(Booking)
@@ -26,6 +44,29 @@ class BookingAdmin(admin.ModelAdmin):
         "job",
     )
 
-    readonly_fields = ("book_id", "created_at")
+    # status and billing only change through the actions below (booking/transitions.py)
+    readonly_fields = ("book_id", "created_at", "status", "amount", "is_paid", "is_completed")
 
     ordering = ("-created_at",)
+
+    actions = [
+        transition_action(Booking.CONFIRMED, "Confirm selected bookings"),
+        transition_action(Booking.CANCELED, "Cancel selected bookings"),
+        transition_action(Booking.INCOMPLETED, "Mark selected bookings incompleted"),
+    ]
+
+
+@admin.register(WorkingHours)
+class WorkingHoursAdmin(admin.ModelAdmin):
+    list_display = ("employee", "weekday", "start_time", "end_time")
+    list_filter = ("weekday",)
+    search_fields = ("employee__user__full_name",)
+    raw_id_fields = ("employee",)
+
+
+@admin.register(AvailabilityException)
+class AvailabilityExceptionAdmin(admin.ModelAdmin):
+    list_display = ("employee", "date", "start_time", "end_time", "is_available", "note")
+    list_filter = ("is_available", "date")
+    search_fields = ("employee__user__full_name", "note")
+    raw_id_fields = ("employee",)
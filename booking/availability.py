@@ -0,0 +1,152 @@
+"""
+Free slots per employee and day, precomputed into FreeSlotDay rows for the
+next SLOT_HORIZON_DAYS and refreshed only for the days a change touches.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from .models import AvailabilityException, Booking, FreeSlotDay, WorkingHours
+
+SLOT_HORIZON_DAYS = 7
+
+
+def horizon_days(start=None):
+    start = start or timezone.localdate()
+    return [start + timedelta(days=offset) for offset in range(SLOT_HORIZON_DAYS)]
+
+
+def local_datetime(day, moment):
+    return timezone.make_aware(datetime.combine(day, moment), timezone.get_current_timezone())
+
+
+def day_bounds(day):
+    return local_datetime(day, time.min), local_datetime(day + timedelta(days=1), time.min)
+
+
+def merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract(intervals, busy):
+    """Parts of the (merged, sorted) `intervals` not covered by any `busy` interval."""
+    free = []
+    busy = merge(busy)
+    for start, end in intervals:
+        for busy_start, busy_end in busy:
+            if busy_end <= start or busy_start >= end:
+                continue
+            if busy_start > start:
+                free.append((start, busy_start))
+            start = max(start, busy_end)
+            if start >= end:
+                break
+        if start < end:
+            free.append((start, end))
+    return free
+
+
+def working_intervals(day, hours, exceptions):
+    todays = [exception for exception in exceptions if exception.date == day]
+    if any(not e.is_available and e.start_time is None for e in todays):
+        return []  # whole day off
+
+    def timed(rows):
+        return [(local_datetime(day, row.start_time), local_datetime(day, row.end_time))
+                for row in rows if row.start_time is not None and row.end_time is not None]
+
+    intervals = timed([h for h in hours if h.weekday == day.weekday()])
+    intervals += timed([e for e in todays if e.is_available])
+    return subtract(merge(intervals), timed([e for e in todays if not e.is_available]))
+
+
+def load_schedule(employee_id, days):
+    hours = list(WorkingHours.objects.filter(employee_id=employee_id))
+    exceptions = list(AvailabilityException.objects.filter(employee_id=employee_id, date__in=days))
+    return hours, exceptions
+
+
+def compute_days(employee_id, days):
+    """{day: [[start, end], ...]} for the given days, or None without a schedule."""
+    hours, exceptions = load_schedule(employee_id, days)
+    if not hours and not exceptions:
+        return None
+
+    window_start, window_end = day_bounds(min(days))[0], day_bounds(max(days))[1]
+    bookings = list(
+        Booking.objects.active()
+        .filter(employee_id=employee_id, booking_date__lt=window_end, end_date__gt=window_start)
+        .values_list('booking_date', 'end_date')
+    )
+    return {
+        day: [[start.isoformat(), end.isoformat()]
+              for start, end in subtract(working_intervals(day, hours, exceptions), bookings)]
+        for day in days
+    }
+
+
+def refresh_days(employee_id, days):
+    """Recompute and store the given days (within the horizon); returns what compute_days did."""
+    horizon = set(horizon_days())
+    days = sorted(day for day in set(days) if day in horizon)
+    if not days:
+        return {}
+    computed = compute_days(employee_id, days)
+    if computed is None:
+        FreeSlotDay.objects.filter(employee_id=employee_id).delete()
+        return None
+    FreeSlotDay.objects.bulk_create(
+        [FreeSlotDay(employee_id=employee_id, day=day, slots=slots) for day, slots in computed.items()],
+        update_conflicts=True,
+        unique_fields=['employee', 'day'],
+        update_fields=['slots'],
+    )
+    return computed
+
+
+def refresh_employee(employee_id):
+    refresh_days(employee_id, horizon_days())
+
+
+def booking_days(booking):
+    """Local dates a booking's time range touches."""
+    first = timezone.localtime(booking.booking_date).date()
+    last = timezone.localtime(booking.end_date - timedelta(microseconds=1)).date()
+    return [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+
+
+def within_working_hours(employee_id, start, end):
+    """Whether [start, end) fits in the employee's working time; True without a schedule."""
+    first, last = timezone.localtime(start).date(), timezone.localtime(end).date()
+    days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    hours, exceptions = load_schedule(employee_id, days)
+    if not hours and not exceptions:
+        return True
+    intervals = merge(interval for day in days for interval in working_intervals(day, hours, exceptions))
+    return any(slot_start <= start and end <= slot_end for slot_start, slot_end in intervals)
+
+
+def free_slots(employee_ids, days):
+    """
+    {employee_id: {day iso: slots} or None}, read from the precomputed rows
+    only. None means no schedule (no rows at all). A day without a row yet
+    (it rolled into the horizon before refresh_free_slots ran) is None too:
+    unknown, not fully booked.
+    """
+    found = {employee_id: None for employee_id in employee_ids}
+    rows = FreeSlotDay.objects.filter(employee_id__in=employee_ids, day__gte=min(days))
+    for employee_id, day, slots in rows.values_list('employee_id', 'day', 'slots'):
+        if found[employee_id] is None:
+            found[employee_id] = {}
+        found[employee_id][day] = slots
+
+    return {
+        employee_id: None if by_day is None else {day.isoformat(): by_day.get(day) for day in days}
+        for employee_id, by_day in found.items()
+    }
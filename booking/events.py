@@ -0,0 +1,150 @@
+"""
+Booking event outbox: status changes append a BookingEvent in the same
+transaction, and `manage.py drain_booking_events` delivers it, at least once,
+to every @consumer.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking, BookingEvent, BookingEventDelivery
+
+logger = logging.getLogger(__name__)
+
+# name -> callable(event); the name is stored with each delivery, don't rename
+CONSUMERS = {}
+
+
+def consumer(name):
+    """Register a consumer; its module must be imported at startup (AppConfig.ready)."""
+    def register(func):
+        CONSUMERS[name] = func
+        return func
+    return register
+
+
+def booking_event(booking, kind, **payload):
+    """An unsaved event for `booking`; write it with record_events."""
+    return BookingEvent(
+        book_id=booking.book_id,
+        kind=kind,
+        payload={"employee_id": booking.employee_id, "client_id": booking.client_id, **payload},
+    )
+
+
+def record_events(events):
+    """Append events; call inside the transaction that made the change."""
+    if events:
+        BookingEvent.objects.bulk_create(events)
+
+
+def retry_delay(attempts):
+    """Backoff before the next try of an event that failed `attempts` times."""
+    seconds = settings.BOOKING_EVENT_RETRY_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.BOOKING_EVENT_MAX_RETRY_SECONDS))
+
+
+def claim(batch_size):
+    """
+    Take up to `batch_size` due events for this worker: pushing their
+    next_attempt_at past BOOKING_EVENT_CLAIM_SECONDS hides them from other
+    workers, and brings them back if this one dies before finishing.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            BookingEvent.objects
+            .filter(processed_at__isnull=True, failed_at__isnull=True, next_attempt_at__lte=now)
+            .select_for_update(skip_locked=True)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        claimed_until = now + timedelta(seconds=settings.BOOKING_EVENT_CLAIM_SECONDS)
+        BookingEvent.objects.filter(pk__in=[event.pk for event in events]).update(next_attempt_at=claimed_until)
+    return events
+
+
+def deliver(event, delivered):
+    """Run the consumers that haven't had `event` yet and record the outcome; True if all succeeded."""
+    ok = True
+    for name, handle in CONSUMERS.items():
+        if name in delivered:
+            continue
+        try:
+            with transaction.atomic():
+                handle(event)
+                BookingEventDelivery.objects.create(event=event, consumer=name)
+        except Exception:
+            logger.exception("Booking event %s failed in consumer %s", event.id, name)
+            ok = False
+
+    now = timezone.now()
+    if ok:
+        changes = {"processed_at": now}
+    else:
+        changes = {"attempts": event.attempts + 1}
+        if changes["attempts"] >= settings.BOOKING_EVENT_MAX_ATTEMPTS:
+            logger.error("Booking event %s failed %s times, giving up", event.id, changes["attempts"])
+            changes["failed_at"] = now
+        else:
+            changes["next_attempt_at"] = now + retry_delay(changes["attempts"])
+    BookingEvent.objects.filter(pk=event.pk).update(**changes)
+    return ok
+
+
+def drain(batch_size=None):
+    """
+    Deliver one batch of due events to every consumer that hasn't had them
+    yet. The batch is claimed in a short transaction; then each consumer's
+    delivery and each event's outcome commit on their own, so no lock is
+    held while a consumer talks to the outside world and a failure only
+    repeats the consumers that failed. Several workers can drain at once.
+    Returns (events completed, events that failed).
+    """
+    events = claim(batch_size or settings.BOOKING_EVENT_BATCH_SIZE)
+    if not events:
+        return 0, 0
+
+    delivered = defaultdict(set)
+    for event_id, name in BookingEventDelivery.objects.filter(event__in=events).values_list('event_id', 'consumer'):
+        delivered[event_id].add(name)
+
+    completed = failed = 0
+    for event in events:
+        if deliver(event, delivered[event.id]):
+            completed += 1
+        else:
+            failed += 1
+    return completed, failed
+
+
+# ---------- Consumers ----------
+@consumer("email_notifications")
+def email_notifications(event):
+    """Tell the employee about a new booking and the client about status changes."""
+    booking = Booking.objects.select_related('client', 'employee__user').filter(book_id=event.book_id).first()
+    if booking is None:
+        return
+    if event.kind == BookingEvent.CREATED:
+        recipient = booking.employee.user
+        subject = "New booking request"
+        message = (
+            f"Hello {recipient.full_name},\n\n{booking.client.full_name} booked you for "
+            f"\"{booking.job}\" on {timezone.localtime(booking.booking_date):%Y-%m-%d %H:%M}."
+        )
+    elif event.kind == BookingEvent.STATUS_CHANGED:
+        recipient = booking.client
+        subject = f"Your booking is now {event.payload['to']}"
+        message = (
+            f"Hello {recipient.full_name},\n\nYour booking for \"{booking.job}\" with "
+            f"{booking.employee.user.full_name} is now {event.payload['to']}."
+        )
+    else:
+        return
+
+    from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', settings.EMAIL_HOST_USER)
+    send_mail(subject, message, from_email, [recipient.email], fail_silently=False)
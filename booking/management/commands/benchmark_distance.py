@@ -0,0 +1,66 @@
+import random
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from helpers.distance import nearest
+from helpers.geo import calculate_distance
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark the per-row haversine loop against the vectorized distance engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+        parser.add_argument("--radius", type=float, default=50)
+        parser.add_argument("--limit", type=int, default=50)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        radius, limit, repeat = options["radius"], options["limit"], options["repeat"]
+        origin_lat, origin_lon = 10.5276, 76.2144
+
+        self.stdout.write(f"{'employees':>10} {'loop (ms)':>12} {'numpy (ms)':>12} {'speedup':>9}")
+        for size in options["sizes"]:
+            # Spread employees over roughly a 600 km square, stored as Decimal like the DB returns
+            lats = [Decimal(f"{origin_lat + rng.uniform(-3, 3):.6f}") for _ in range(size)]
+            lons = [Decimal(f"{origin_lon + rng.uniform(-3, 3):.6f}") for _ in range(size)]
+
+            def loop():
+                results = []
+                for i in range(size):
+                    distance = calculate_distance(origin_lat, origin_lon, float(lats[i]), float(lons[i]))
+                    if distance <= radius:
+                        results.append((distance, i))
+                results.sort()
+                return results[:limit]
+
+            lat_array = np.array(lats, dtype=np.float64)
+            lon_array = np.array(lons, dtype=np.float64)
+
+            def vectorized():
+                return nearest(origin_lat, origin_lon, lat_array, lon_array, radius_km=radius, k=limit)
+
+            expected = [i for _, i in loop()]
+            positions, _ = vectorized()
+            if list(positions) != expected:
+                self.stderr.write(self.style.WARNING(f"Result mismatch at {size} employees"))
+
+            loop_time = best_of(repeat, loop)
+            numpy_time = best_of(repeat, vectorized)
+            self.stdout.write(
+                f"{size:>10} {loop_time * 1000:>12.2f} {numpy_time * 1000:>12.2f} {loop_time / numpy_time:>8.1f}x"
+            )
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from booking.events import drain
+
+
+class Command(BaseCommand):
+    help = "Deliver pending booking events to their consumers (see booking/events.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.BOOKING_EVENT_BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true", help="Keep draining, as a worker process.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when no event is due.")
+
+    def handle(self, *args, **options):
+        total_completed = total_failed = 0
+        while True:
+            completed, failed = drain(options["batch_size"])
+            total_completed += completed
+            total_failed += failed
+            if not (completed or failed):
+                # nothing due: failed events wait out their backoff
+                if not options["loop"]:
+                    break
+                time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Delivered {total_completed} booking events, {total_failed} failed (retried after a backoff)."
+        ))
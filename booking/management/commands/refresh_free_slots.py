@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from booking.availability import refresh_employee
+from booking.models import AvailabilityException, FreeSlotDay, WorkingHours
+
+
+class Command(BaseCommand):
+    help = "Drop past free-slot days and precompute the horizon for every employee with a schedule (run daily)."
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        dropped, _ = FreeSlotDay.objects.filter(day__lt=today).delete()
+
+        employee_ids = set(WorkingHours.objects.values_list("employee_id", flat=True)) | set(
+            AvailabilityException.objects.filter(date__gte=today).values_list("employee_id", flat=True)
+        )
+        for employee_id in employee_ids:
+            refresh_employee(employee_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Dropped {dropped} past days, refreshed {len(employee_ids)} employees."
+        ))
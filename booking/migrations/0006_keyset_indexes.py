@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_employeeprofile_skills_gin'),
+        ('booking', '0005_alter_booking_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['employee', '-created_at', '-book_id'], name='booking_employee_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['client', '-created_at', '-book_id'], name='booking_client_list_idx'),
+        ),
+    ]
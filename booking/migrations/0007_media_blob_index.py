@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaint',
+            name='attachment',
+            field=models.FileField(blank=True, db_index=True, null=True, upload_to='complaint_attachments/'),
+        ),
+    ]
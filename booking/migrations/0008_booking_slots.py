@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:00
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_end_date(apps, schema_editor):
+    Booking = apps.get_model('booking', 'Booking')
+    # Existing bookings all get the default 60 minute duration
+    Booking.objects.update(end_date=F('booking_date') + timedelta(minutes=60))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_media_blob_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=60),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='end_date',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='booking',
+            name='end_date',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['employee', 'end_date'], name='booking_employee_slot_idx'),
+        ),
+    ]
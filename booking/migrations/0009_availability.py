@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_media_blob_index'),
+        ('booking', '0008_booking_slots'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('is_available', models.BooleanField(default=False)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_exceptions', to='account.employeeprofile')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['employee', 'date'], name='booking_exception_employee_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FreeSlotDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('slots', models.JSONField(default=list)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='free_slot_days', to='account.employeeprofile')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('employee', 'day'), name='booking_freeslotday_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='working_hours', to='account.employeeprofile')),
+            ],
+            options={
+                'ordering': ['weekday', 'start_time'],
+                'indexes': [models.Index(fields=['employee', 'weekday'], name='booking_hours_employee_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('end_time__gt', models.F('start_time'))), name='booking_workinghours_order')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_media_blob_index'),
+        ('booking', '0009_availability'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['employee', 'status', '-created_at', '-book_id'], name='booking_employee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['client', 'status', '-created_at', '-book_id'], name='booking_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', '-created_at'], name='booking_status_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_list_status_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('book_id', models.UUIDField(db_index=True)),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('status_changed', 'Status changed')], max_length=20)),
+                ('payload', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='booking_event_pending_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BookingEventDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=100)),
+                ('delivered_at', models.DateTimeField(auto_now_add=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='booking.bookingevent')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('event', 'consumer'), name='booking_eventdelivery_unique')],
+            },
+        ),
+    ]
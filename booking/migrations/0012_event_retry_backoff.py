@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:30
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def mark_exhausted_events(apps, schema_editor):
+    BookingEvent = apps.get_model('booking', 'BookingEvent')
+    # Events the drain already gave up on leave the pending index
+    BookingEvent.objects.filter(
+        processed_at__isnull=True, attempts__gte=settings.BOOKING_EVENT_MAX_ATTEMPTS,
+    ).update(failed_at=Now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_booking_events'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='bookingevent',
+            name='booking_event_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='bookingevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bookingevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(mark_exhausted_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='bookingevent',
+            index=models.Index(condition=models.Q(('failed_at__isnull', True), ('processed_at__isnull', True)), fields=['next_attempt_at', 'id'], name='booking_event_pending_idx'),
+        ),
+    ]
@@ -1,7 +1,21 @@
 import uuid
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 from account.models import User, EmployeeProfile
 
+
+# --------- Booking QuerySet ---------
+class BookingQuerySet(models.QuerySet):
+    def active(self):
+        """Bookings that still hold their time slot."""
+        return self.filter(status__in=Booking.ACTIVE_STATUSES)
+
+    def overlapping(self, employee, start, end):
+        return self.filter(employee=employee, booking_date__lt=end, end_date__gt=start)
+
+
 # --------- Booking Model ---------
 class Booking(models.Model):
     """
@@ -16,6 +30,10 @@ class Booking(models.Model):
     CANCELED = "canceled"
     INCOMPLETED = "incompleted"
 
+    # statuses that keep the employee's time slot taken
+    ACTIVE_STATUSES = (PENDING, CONFIRMED, IN_PROGRESS)
+    DEFAULT_DURATION_MINUTES = 60
+
     STATUS_CHOICES = [
         (PENDING, "Pending"),
         (CANCELED, "Canceled"),
@@ -27,13 +45,17 @@ class Booking(models.Model):
 
     client = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bookings")
     employee = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE, related_name="appointments")
-    booking_date = models.DateTimeField()
+    booking_date = models.DateTimeField()  # start of the slot
+    duration_minutes = models.PositiveIntegerField(default=DEFAULT_DURATION_MINUTES)
+    end_date = models.DateTimeField(editable=False)  # booking_date + duration, kept in save()
     job = models.CharField(max_length=100)
     amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     is_paid = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     is_completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BookingQuerySet.as_manager()
     
     
     def __str__(self):
@@ -41,7 +63,150 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination of each party's booking list
+            models.Index(fields=['employee', '-created_at', '-book_id'], name='booking_employee_list_idx'),
+            models.Index(fields=['client', '-created_at', '-book_id'], name='booking_client_list_idx'),
+            # the same lists filtered by ?status=
+            models.Index(fields=['employee', 'status', '-created_at', '-book_id'], name='booking_employee_status_idx'),
+            models.Index(fields=['client', 'status', '-created_at', '-book_id'], name='booking_client_status_idx'),
+            # all bookings in a status, newest first (admin, reports)
+            models.Index(fields=['status', '-created_at'], name='booking_status_idx'),
+            # overlap checks only scan the employee's bookings ending after the new slot starts
+            models.Index(fields=['employee', 'end_date'], name='booking_employee_slot_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember where the booking sat, so moving it also frees the old day(s)
+        loaded = instance.__dict__
+        if {'employee_id', 'booking_date', 'end_date'} <= loaded.keys():
+            instance._loaded_slot = (loaded['employee_id'], loaded['booking_date'], loaded['end_date'])
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.end_date = self.booking_date + timedelta(minutes=self.duration_minutes)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'booking_date', 'duration_minutes'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'end_date'}
+        super().save(*args, **kwargs)
+        self._loaded_slot = (self.employee_id, self.booking_date, self.end_date)
+
+
+
+# --------- Availability ---------
+class WorkingHours(models.Model):
+    """A weekly working interval, in local time (TIME_ZONE). Several per day are allowed."""
+    WEEKDAY_CHOICES = [
+        (0, "Monday"), (1, "Tuesday"), (2, "Wednesday"), (3, "Thursday"),
+        (4, "Friday"), (5, "Saturday"), (6, "Sunday"),
+    ]
+    employee = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE, related_name="working_hours")
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        constraints = [
+            models.CheckConstraint(condition=models.Q(end_time__gt=models.F('start_time')), name='booking_workinghours_order'),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'weekday'], name='booking_hours_employee_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id}: {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+
+class AvailabilityException(models.Model):
+    """
+    A one-off change to the weekly hours on a date: time off (whole day when
+    no times are given) or, with is_available, extra working time.
+    """
+    employee = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE, related_name="availability_exceptions")
+    date = models.DateField()
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    is_available = models.BooleanField(default=False)
+    note = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['employee', 'date'], name='booking_exception_employee_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.employee_id}: {'extra' if self.is_available else 'off'} on {self.date}"
+
+
+class FreeSlotDay(models.Model):
+    """
+    Precomputed free intervals of one employee on one day: working hours and
+    exceptions minus active bookings. Maintained by booking/availability.py.
+    """
+    employee = models.ForeignKey(EmployeeProfile, on_delete=models.CASCADE, related_name="free_slot_days")
+    day = models.DateField()
+    slots = models.JSONField(default=list)  # [[start iso, end iso], ...]
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'day'], name='booking_freeslotday_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_id} on {self.day}: {len(self.slots)} free slots"
+
+
+# --------- Booking events (outbox) ---------
+class BookingEvent(models.Model):
+    """
+    Append-only log of booking changes, written in the same transaction as
+    the change itself and delivered to consumers later by
+    `manage.py drain_booking_events` (booking/events.py).
+    """
+    CREATED = "created"
+    STATUS_CHANGED = "status_changed"
+    KIND_CHOICES = [(CREATED, "Created"), (STATUS_CHANGED, "Status changed")]
+
+    id = models.BigAutoField(primary_key=True)
+    book_id = models.UUIDField(db_index=True)  # no FK: the log outlives deleted bookings
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)  # every consumer has it
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # not drained before this: retry backoff, or a worker's claim on it
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    failed_at = models.DateTimeField(null=True, blank=True)  # gave up after BOOKING_EVENT_MAX_ATTEMPTS
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # the drain reads only live events that are due, oldest first
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(processed_at__isnull=True, failed_at__isnull=True),
+                name='booking_event_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} {self.book_id}"
+
+
+class BookingEventDelivery(models.Model):
+    """One row per (event, consumer) that has handled the event: redeliveries skip it."""
+    event = models.ForeignKey(BookingEvent, on_delete=models.CASCADE, related_name="deliveries")
+    consumer = models.CharField(max_length=100)
+    delivered_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'consumer'], name='booking_eventdelivery_unique'),
+        ]
 
 
 # --------- Complaint Model ---------
@@ -75,7 +240,7 @@ class Complaint(models.Model):
 
     subject = models.CharField(max_length=200)
     description = models.TextField()
-    attachment = models.FileField(upload_to='complaint_attachments/', blank=True, null=True)
+    attachment = models.FileField(upload_to='complaint_attachments/', blank=True, null=True, db_index=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     admin_response = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
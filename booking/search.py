@@ -0,0 +1,67 @@
+import base64
+import binascii
+
+import numpy as np
+
+from helpers.distance import haversine_many
+
+DISTANCE_WEIGHT = 0.6
+RATING_WEIGHT = 0.4
+MAX_RATING = 5
+SCORE_DECIMALS = 6
+
+
+def encode_cursor(score, user_id):
+    return base64.urlsafe_b64encode(f"{score:.{SCORE_DECIMALS}f}:{user_id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(score, user_id) from a cursor string, ValueError if it is malformed."""
+    try:
+        score, user_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(score), int(user_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def rank_employees(lat, lon, rows, radius_km, limit, after=None,
+                   distance_weight=DISTANCE_WEIGHT, rating_weight=RATING_WEIGHT):
+    """
+    Score and page candidate employees in one vectorized pass.
+
+    `rows` are (user_id, latitude, longitude, average_rating) tuples. The score
+    mixes closeness (1 at the origin, 0 at the radius edge) with rating (0-5
+    scaled to 0-1). Results are ordered by (score desc, user_id asc) and
+    `after` is the (score, user_id) of the last result of the previous page.
+
+    Returns (user_ids, distances, scores, has_more).
+    """
+    if not rows:
+        return [], [], [], False
+
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    lats = np.array([row[1] for row in rows], dtype=np.float64)
+    lons = np.array([row[2] for row in rows], dtype=np.float64)
+    ratings = np.array([row[3] or 0 for row in rows], dtype=np.float64)
+
+    distances = haversine_many(lat, lon, lats, lons)
+    scores = np.round(
+        distance_weight * (1 - distances / radius_km) + rating_weight * (ratings / MAX_RATING),
+        SCORE_DECIMALS,
+    )
+
+    mask = distances <= radius_km
+    if after is not None:
+        after_score, after_id = after
+        mask &= (scores < after_score) | ((scores == after_score) & (ids > after_id))
+
+    positions = np.flatnonzero(mask)
+    if positions.size > limit + 1:
+        # Only the best limit + 1 need sorting; keep every tie at the cut-off score
+        cutoff = np.partition(-scores[positions], limit)[limit]
+        positions = positions[-scores[positions] <= cutoff]
+    positions = positions[np.lexsort((ids[positions], -scores[positions]))]
+
+    has_more = positions.size > limit
+    positions = positions[:limit]
+    return ids[positions].tolist(), distances[positions].tolist(), scores[positions].tolist(), has_more
@@ -1,34 +1,59 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from account.serializers import EmployeeProfileSerializer 
-from .models import Booking 
+from .models import AvailabilityException, Booking, BookingEvent, WorkingHours
+from .availability import within_working_hours
+from .transitions import transition
+from .events import booking_event, record_events
 from account.models import EmployeeProfile, User
+from helpers.images import ImageVariantField
+from helpers.serializers import SparseFieldsMixin
 from datetime import date, timedelta
+from decimal import Decimal
 
 User = get_user_model()
 
 class NearbyEmployeeSerializer(serializers.ModelSerializer):
     employee_profile = EmployeeProfileSerializer(read_only=True)
     distance_km = serializers.FloatField(read_only=True)
+    profile_image_variant = ImageVariantField("profile_image", variant="thumb")
 
     class Meta:
         model = User
         fields = [
             "id", "full_name", "email", "location",
-            "latitude", "longitude", "distance_km", 'profile_image' ,
+            "latitude", "longitude", "distance_km", 'profile_image' , "profile_image_variant",
             "employee_profile"
         ]
 
 
+class RankedEmployeeSerializer(NearbyEmployeeSerializer):
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(NearbyEmployeeSerializer.Meta):
+        fields = NearbyEmployeeSerializer.Meta.fields + ["score"]
+
+
+class EmployeeSearchParamsSerializer(serializers.Serializer):
+    """Numeric filters of EmployeeSearchView; DecimalField turns NaN and Infinity away."""
+    min_rate = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0"), required=False)
+    max_rate = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0"), required=False)
+    min_rating = serializers.DecimalField(
+        max_digits=3, decimal_places=2, min_value=Decimal("0"), max_value=Decimal("5"), required=False,
+    )
+
+
 #-------- Fetch Id  With Employee  --------------------
 class UserWithEmployeeSerializer(serializers.ModelSerializer):
     employee_profile = EmployeeProfileSerializer(read_only=True)
+    profile_image_variant = ImageVariantField("profile_image", variant="full")
    
     class Meta:
         model = User
         fields = [
             "id", "email", "full_name", "role", "phone",
-            "location", "latitude", "longitude", "profile_image",
+            "location", "latitude", "longitude", "profile_image", "profile_image_variant",
             "employee_profile",  
         ]
 
@@ -40,7 +65,8 @@ class BookingCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Booking
-        fields = [  "book_id" , "booking_date", "job", "employee_id" , "employee" ]
+        fields = [  "book_id" , "booking_date", "duration_minutes", "job", "employee_id" , "employee" ]
+        extra_kwargs = {"duration_minutes": {"min_value": 15, "max_value": 12 * 60}}
 
     def validate_booking_date(self, value):
         # Convert datetime → date
@@ -71,17 +97,86 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         client = request.user
 
         employee_id = validated_data.pop("employee_id")
-        employee = EmployeeProfile.objects.get(id=employee_id)
+        start = validated_data["booking_date"]
+        end = start + timedelta(minutes=validated_data.get("duration_minutes", Booking.DEFAULT_DURATION_MINUTES))
+
+        with transaction.atomic():
+            # Lock this employee's profile row: bookings for the same employee
+            # queue up behind each other here, other employees aren't blocked
+            employee = EmployeeProfile.objects.select_for_update().get(id=employee_id)
+            if not within_working_hours(employee.id, start, end):
+                raise serializers.ValidationError(
+                    {"booking_date": "The employee does not work at this time."}
+                )
+            if Booking.objects.active().overlapping(employee, start, end).exists():
+                raise serializers.ValidationError(
+                    {"booking_date": "The employee is already booked at this time."}
+                )
+            booking = Booking.objects.create(
+                client=client,
+                employee=employee,
+                status=Booking.PENDING,
+                **validated_data
+            )
+            record_events([booking_event(booking, BookingEvent.CREATED, booking_date=start.isoformat())])
+            return booking
+
+#-------- Availability --------------------
+class WorkingHoursSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkingHours
+        fields = ["id", "weekday", "start_time", "end_time"]
+
+    def validate(self, attrs):
+        if attrs["end_time"] <= attrs["start_time"]:
+            raise serializers.ValidationError({"end_time": "End time must be after start time."})
+        return attrs
+
+
+class AvailabilityExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityException
+        fields = ["id", "date", "start_time", "end_time", "is_available", "note"]
+
+    def validate(self, attrs):
+        start, end = attrs.get("start_time"), attrs.get("end_time")
+        if (start is None) != (end is None):
+            raise serializers.ValidationError("Give both start_time and end_time, or neither for the whole day.")
+        if start is not None and end <= start:
+            raise serializers.ValidationError({"end_time": "End time must be after start time."})
+        if attrs.get("is_available") and start is None:
+            raise serializers.ValidationError({"start_time": "Extra working time needs start_time and end_time."})
+        return attrs
 
-        # employee.available = False
-        employee.save()
 
-        return Booking.objects.create(
-            client=client,
-            employee=employee,
-            status=Booking.PENDING,
-            **validated_data
-        )
+#-------- Booking list --------------------
+class BookingPartySerializer(serializers.ModelSerializer):
+    """Just enough of a user to show them in a list row."""
+    thumbnail = ImageVariantField("profile_image", variant="thumb")
+
+    class Meta:
+        model = User
+        fields = ["id", "full_name", "profile_image", "thumbnail"]
+
+
+class BookingListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Compact list row: ids, names and thumbnails of both parties, from one
+    joined query (see booking.views.bookings_for_list). The full record is
+    served by BookingRetrieveAPIView.
+    """
+    client = BookingPartySerializer(read_only=True)
+    employee = BookingPartySerializer(source="employee.user", read_only=True)
+    employee_id = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = [
+            "book_id", "booking_date", "duration_minutes", "end_date", "job", "status",
+            "is_completed", "is_paid", "amount", "created_at",
+            "client", "employee", "employee_id",
+        ]
+
 
 class BookingDetailSerializer(serializers.ModelSerializer):
     client_name = serializers.CharField(source="client.full_name", read_only=True)
@@ -96,6 +191,8 @@ class BookingDetailSerializer(serializers.ModelSerializer):
         
             "book_id",
             "booking_date",
+            "duration_minutes",
+            "end_date",
             "job",
             "client",
             "client_name",
@@ -115,31 +212,35 @@ class BookingDetailSerializer(serializers.ModelSerializer):
 
 class BookingStatusUpdateSerializer(serializers.ModelSerializer):
     working_hours = serializers.DecimalField(
-        max_digits=5, decimal_places=2, required=False
+        max_digits=5, decimal_places=2, min_value=Decimal("0.01"), required=False, write_only=True
     )
 
     class Meta:
         model = Booking
-        fields = ["status", "working_hours"]
+        fields = ["book_id", "status", "working_hours", "amount", "is_paid", "is_completed"]
+        read_only_fields = ["book_id", "amount", "is_paid", "is_completed"]
+
+    def validate(self, attrs):
+        # PATCH is a partial update, which skips `required`
+        if "status" not in attrs:
+            raise serializers.ValidationError({"status": "This field is required."})
+        return attrs
 
     def update(self, instance, validated_data):
-        status = validated_data.get("status")
-        working_hours = validated_data.get("working_hours")
+        # one conditional UPDATE, checked against the transition table
+        return transition(instance, validated_data["status"], validated_data.get("working_hours"))
 
-        # If job is completed, calculate amount
-        if status == Booking.COMPLETED:
-            if working_hours is None:
-                raise serializers.ValidationError(
-                    {"working_hours": "Working hours are required to complete the job."}
-                )
 
-            rate = instance.employee.hourly_rate
-            instance.amount = float(rate) * float(working_hours)
-            instance.is_paid = True
-            instance.is_completed = True
+BULK_TRANSITION_MAX_ITEMS = 200
+
+
+class BookingTransitionItemSerializer(serializers.Serializer):
+    book_id = serializers.UUIDField()
+    status = serializers.ChoiceField(choices=Booking.STATUS_CHOICES)
+    working_hours = serializers.DecimalField(
+        max_digits=5, decimal_places=2, min_value=Decimal("0.01"), required=False
+    )
 
-        # Update status only
-        instance.status = status
-        instance.save(update_fields=["status", "amount", "is_paid", "is_completed"])
 
-        return instance
+class BulkBookingStatusUpdateSerializer(serializers.Serializer):
+    items = BookingTransitionItemSerializer(many=True, allow_empty=False, max_length=BULK_TRANSITION_MAX_ITEMS)
@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from helpers.storage import remember_media, release_media
+from helpers.tasks import submit
+from .availability import booking_days, refresh_days, refresh_employee
+from .models import AvailabilityException, Booking, Complaint, WorkingHours
+
+# Booking fields that change when (or whether) an employee is busy
+SLOT_FIELDS = {"status", "booking_date", "duration_minutes", "end_date"}
+
+
+# ---------- Media blob cleanup ----------
+@receiver(pre_save, sender=Complaint)
+def complaint_saving(sender, instance, update_fields=None, **kwargs):
+    remember_media(instance, "attachment", update_fields)
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_attachment_replaced(sender, instance, **kwargs):
+    release_media(instance, "attachment")
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    release_media(instance, "attachment", deleted=True)
+
+
+# ---------- Free slots ----------
+def schedule_slot_refresh(booking):
+    employee_id, days = booking.employee_id, booking_days(booking)
+    transaction.on_commit(lambda: submit(refresh_days, employee_id, days))
+
+
+@receiver(pre_save, sender=Booking)
+def booking_saving(sender, instance, update_fields=None, **kwargs):
+    # a moved booking frees its old day(s) as well
+    if instance._state.adding or (update_fields is not None and not SLOT_FIELDS & set(update_fields)):
+        return
+    loaded = instance.__dict__.get("_loaded_slot")
+    if loaded is None:
+        # loaded with deferred slot fields, read them from the row
+        loaded = Booking.objects.filter(pk=instance.pk).values_list("employee_id", "booking_date", "end_date").first()
+    if loaded and loaded != (instance.employee_id, instance.booking_date, instance.end_date):
+        employee_id, booking_date, end_date = loaded
+        schedule_slot_refresh(Booking(employee_id=employee_id, booking_date=booking_date, end_date=end_date))
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SLOT_FIELDS & set(update_fields):
+        schedule_slot_refresh(instance)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    schedule_slot_refresh(instance)
+
+
+@receiver(post_save, sender=WorkingHours)
+@receiver(post_delete, sender=WorkingHours)
+@receiver(post_save, sender=AvailabilityException)
+@receiver(post_delete, sender=AvailabilityException)
+def schedule_changed(sender, instance, origin=None, **kwargs):
+    employee_id = instance.employee_id
+    if isinstance(origin, QuerySet):
+        # a queryset delete signals every row: refresh each employee once
+        refreshed = origin.__dict__.setdefault("_refreshed_employees", set())
+        if employee_id in refreshed:
+            return
+        refreshed.add(employee_id)
+    transaction.on_commit(lambda: submit(refresh_employee, employee_id))
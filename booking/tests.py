@@ -1,3 +1,675 @@
-from django.test import TestCase
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from account.locations import employee_locations
+from account.models import User, EmployeeProfile, EmployeeReview
+from .availability import horizon_days, local_datetime, subtract
+from .events import CONSUMERS, claim, drain
+from .models import AvailabilityException, Booking, BookingEvent, FreeSlotDay, WorkingHours
+
+
+# ---------- Query count regression tests ----------
+class ListingQueryCountTests(TestCase):
+    """
+    Listing endpoints must cost a fixed number of queries no matter how many
+    rows they return. Raise a limit only when adding a deliberate query.
+    """
+    ROWS = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client",
+            role="client", latitude="10.000000", longitude="76.000000",
+        )
+        reviewers = [
+            User.objects.create_user(email=f"reviewer{i}@example.com", password="pass1234",
+                                     full_name=f"Reviewer {i}", role="client")
+            for i in range(3)
+        ]
+        cls.employees = []
+        for i in range(cls.ROWS):
+            user = User.objects.create_user(
+                email=f"employee{i}@example.com", password="pass1234", full_name=f"Employee {i}",
+                role="employee", latitude=f"{10 + i / 1000:.6f}", longitude="76.000000",
+            )
+            profile = EmployeeProfile.objects.create(user=user, hourly_rate=100)
+            for reviewer in reviewers:
+                EmployeeReview.objects.create(employee=user, client=reviewer, rating=1 + i % 5)
+            Booking.objects.create(
+                client=cls.client_user, employee=profile, job="Wiring",
+                booking_date=timezone.now() + timedelta(days=1),
+            )
+            cls.employees.append(user)
+
+    def setUp(self):
+        self.api = APIClient()
+        employee_locations.loaded = False
+
+    def assertMaxQueries(self, limit, url, user):
+        self.api.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertLessEqual(
+            len(ctx.captured_queries), limit,
+            "\n".join(q["sql"] for q in ctx.captured_queries),
+        )
+        return response
+
+    @override_settings(EMPLOYEE_LOCATION_SNAPSHOT=True)
+    def test_nearby_employees(self):
+        self.api.force_authenticate(self.client_user)
+        self.api.get("/api/book/nearby/")  # load the location snapshot
+        response = self.assertMaxQueries(2, "/api/book/nearby/", self.client_user)
+        self.assertEqual(len(response.json()), self.ROWS)
+        self.assertEqual(response.json()[0]["employee_profile"]["review_count"], 3)
+
+    def test_employee_detail(self):
+        self.assertMaxQueries(2, f"/api/book/employee/{self.employees[0].id}/", self.client_user)
+
+    def test_client_booking_list(self):
+        response = self.assertMaxQueries(3, "/api/book/client/", self.client_user)
+        self.assertEqual(len(response.json()["results"]), self.ROWS)
+
+    def test_employee_booking_list(self):
+        self.assertMaxQueries(3, "/api/book/employee/", self.employees[0])
+
+
+# ---------- Employee search ----------
+KM_IN_LATITUDE = 1 / 111.195  # degrees of latitude per km
+
+
+class EmployeeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client",
+            role="client", latitude="10.000000", longitude="76.000000",
+        )
+        # (name, km north of the client, rating, hourly rate)
+        cls.employees = {
+            name: cls.employee(name, km, rating, rate)
+            for name, km, rating, rate in (
+                ("near_top", 1, 5, 300), ("far_top", 20, 5, 100), ("near_new", 1, 0, 100),
+                ("near_new_twin", 1, 0, 100), ("far_new", 30, 0, 100),
+            )
+        }
+        cls.employee("out_of_range", 80, 5, 100)
+
+    @classmethod
+    def employee(cls, name, km, rating, rate):
+        user = User.objects.create_user(
+            email=f"{name}@example.com", password="pass1234", full_name=name, role="employee",
+            latitude=f"{10 + km * KM_IN_LATITUDE:.6f}", longitude="76.000000",
+        )
+        EmployeeProfile.objects.create(user=user, hourly_rate=rate)
+        EmployeeProfile.objects.filter(user=user).update(average_rating=rating)
+        return user.id
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def search(self, query=""):
+        response = self.api.get(f"/api/book/search/?{query}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def names(self, body):
+        return [row["full_name"] for row in body["results"]]
+
+    def test_bad_params_are_rejected(self):
+        for query in ("min_rate=nan", "min_rate=inf", "max_rate=-Infinity", "min_rating=nan", "min_rating=6",
+                      "max_rate=-1", "min_rate=cheap", "cursor=bogus", "radius=nan", "radius=inf"):
+            response = self.api.get(f"/api/book/search/?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_ranked_by_distance_and_rating(self):
+        self.assertEqual(
+            self.names(self.search()), ["near_top", "far_top", "near_new", "near_new_twin", "far_new"],
+        )
+        self.assertEqual(self.names(self.search("min_rating=4.5")), ["near_top", "far_top"])
+        self.assertEqual(self.names(self.search("max_rate=150&min_rating=1")), ["far_top"])
+        self.assertEqual(self.names(self.search("min_rate=200")), ["near_top"])
+
+    def test_next_page_follows_the_last_row(self):
+        first = self.search("limit=3")
+        self.assertEqual(self.names(first), ["near_top", "far_top", "near_new"])
+        second = self.api.get(first["next"]).json()
+        # near_new_twin ties with near_new on score and follows it by id
+        self.assertEqual(self.names(second), ["near_new_twin", "far_new"])
+        self.assertIsNone(second["next"])
+
+
+# ---------- Booking list and detail ----------
+class BookingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client", role="client",
+        )
+        cls.employee = User.objects.create_user(
+            email="employee@example.com", password="pass1234", full_name="Employee", role="employee",
+        )
+        cls.stranger = User.objects.create_user(
+            email="stranger@example.com", password="pass1234", full_name="Stranger", role="client",
+        )
+        profile = EmployeeProfile.objects.create(user=cls.employee, hourly_rate=100)
+        cls.bookings = [
+            Booking.objects.create(
+                client=cls.client_user, employee=profile, job="Wiring",
+                booking_date=timezone.now() + timedelta(days=1, hours=hours),
+            )
+            for hours in range(3)
+        ]
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def test_fields_picks_the_row_keys(self):
+        rows = self.api.get("/api/book/client/?fields=book_id, status").json()["results"]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual([set(row) for row in rows], [{"book_id", "status"}] * 3)
+
+        row = self.api.get("/api/book/client/").json()["results"][0]
+        self.assertEqual(row["employee"]["full_name"], "Employee")
+        self.assertEqual(set(row["client"]), {"id", "full_name", "profile_image", "thumbnail"})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.api.get("/api/book/client/?fields=book_id,password")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("password", response.json()["fields"])
+
+    def test_list_is_one_query(self):
+        for user, url in ((self.client_user, "/api/book/client/"), (self.employee, "/api/book/employee/")):
+            self.api.force_authenticate(user)
+            with self.assertNumQueries(1):
+                response = self.api.get(url)
+            self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_detail_only_for_the_parties(self):
+        url = f"/api/book/{self.bookings[0].book_id}/"
+        for user in (self.client_user, self.employee):
+            self.api.force_authenticate(user)
+            self.assertEqual(self.api.get(url).json()["book_id"], str(self.bookings[0].book_id))
+        self.api.force_authenticate(self.stranger)
+        self.assertEqual(self.api.get(url).status_code, 404)
+
+
+# ---------- Slot locking ----------
+def next_slot(hours=0):
+    start = (timezone.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+    return (start + timedelta(hours=hours)).isoformat()
+
+
+class BookingSlotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client", role="client",
+        )
+        employee = User.objects.create_user(
+            email="employee@example.com", password="pass1234", full_name="Employee", role="employee",
+        )
+        cls.profile = EmployeeProfile.objects.create(user=employee, hourly_rate=100)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def book(self, booking_date, duration=60):
+        return self.api.post("/api/book/create/", {
+            "employee_id": self.profile.id, "booking_date": booking_date,
+            "duration_minutes": duration, "job": "Wiring",
+        }, format="json")
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.book(next_slot(), duration=90).status_code, 201)
+        response = self.book(next_slot(1))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("booking_date", response.json())
+
+    def test_adjacent_booking_is_allowed(self):
+        self.assertEqual(self.book(next_slot()).status_code, 201)
+        self.assertEqual(self.book(next_slot(1)).status_code, 201)
+
+    def test_canceled_booking_frees_the_slot(self):
+        self.assertEqual(self.book(next_slot()).status_code, 201)
+        Booking.objects.update(status=Booking.CANCELED)
+        self.assertEqual(self.book(next_slot()).status_code, 201)
+
+
+@skipUnless(connection.vendor == "postgresql", "row locks (SELECT ... FOR UPDATE) need PostgreSQL")
+class ConcurrentBookingTests(TransactionTestCase):
+    """Many clients racing for the same employee and slot: exactly one wins."""
+    CLIENTS = 16
+
+    def test_one_booking_per_slot_under_load(self):
+        employee = User.objects.create_user(
+            email="employee@example.com", password="pass1234", full_name="Employee", role="employee",
+        )
+        profile = EmployeeProfile.objects.create(user=employee, hourly_rate=100)
+        clients = [
+            User.objects.create_user(email=f"client{i}@example.com", password="pass1234",
+                                     full_name=f"Client {i}", role="client")
+            for i in range(self.CLIENTS)
+        ]
+        start_line = threading.Barrier(self.CLIENTS)
+        booking_date = next_slot()
+
+        def book(client):
+            try:
+                api = APIClient()
+                api.force_authenticate(client)
+                start_line.wait()
+                return api.post("/api/book/create/", {
+                    "employee_id": profile.id, "booking_date": booking_date, "job": "Wiring",
+                }, format="json").status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.CLIENTS) as pool:
+            codes = list(pool.map(book, clients))
+
+        self.assertEqual(codes.count(201), 1, codes)
+        self.assertEqual(codes.count(400), self.CLIENTS - 1, codes)
+        self.assertEqual(Booking.objects.filter(employee=profile).count(), 1)
+
+
+# ---------- Status transitions ----------
+class BookingTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        client = User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client", role="client",
+        )
+        cls.employee = User.objects.create_user(
+            email="employee@example.com", password="pass1234", full_name="Employee", role="employee",
+        )
+        profile = EmployeeProfile.objects.create(user=cls.employee, hourly_rate="33.33")
+        cls.booking = Booking.objects.create(
+            client=client, employee=profile, job="Wiring", booking_date=timezone.now() + timedelta(days=1),
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.employee)
+        self.url = f"/api/book/update/{self.booking.book_id}/"
+
+    def test_one_query_to_authorize_and_one_to_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.api.patch(self.url, {"status": Booking.CONFIRMED}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        queries = [q["sql"] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+        # + the outbox insert (booking/events.py)
+        self.assertEqual(len(queries), 3, "\n".join(queries))
+
+    def test_transitions_follow_the_table(self):
+        response = self.api.patch(self.url, {"status": Booking.COMPLETED, "working_hours": "1.5"}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+        for target in (Booking.CONFIRMED, Booking.IN_PROGRESS):
+            self.assertEqual(self.api.patch(self.url, {"status": target}, format="json").status_code, 200)
+        response = self.api.patch(self.url, {"status": Booking.COMPLETED, "working_hours": "1.5"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["amount"], "50.00")  # 33.33 * 1.5, rounded half up
+
+        self.assertEqual(self.api.patch(self.url, {"status": Booking.CANCELED}, format="json").status_code, 400)
+
+    def test_status_is_required(self):
+        response = self.api.patch(self.url, {"working_hours": "1"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("status", response.json())
+        self.assertEqual(self.api.patch(self.url, {}, format="json").status_code, 400)
+
+    def test_admin_form_cannot_set_the_status(self):
+        staff = User.objects.create_superuser(email="admin@example.com", password="pass1234", full_name="Admin")
+        self.client.force_login(staff)
+        url = f"/admin/booking/booking/{self.booking.pk}/change/"
+        form = self.client.get(url).context["adminform"].form
+        self.assertFalse({"status", "amount", "is_paid", "is_completed"} & set(form.fields))
+
+        response = self.client.post("/admin/booking/booking/", {
+            "action": "mark_confirmed", "_selected_action": [self.booking.pk],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Booking.objects.get(pk=self.booking.pk).status, Booking.CONFIRMED)
+        self.assertEqual(BookingEvent.objects.get().payload["to"], Booking.CONFIRMED)
+
+    def test_bulk_applies_valid_items_and_reports_the_rest(self):
+        other = Booking.objects.create(
+            client=self.booking.client, employee=self.booking.employee, job="Wiring",
+            booking_date=self.booking.end_date,
+        )
+        response = self.api.post("/api/book/update/bulk/", {"items": [
+            {"book_id": str(self.booking.book_id), "status": Booking.CONFIRMED},
+            {"book_id": str(other.book_id), "status": Booking.COMPLETED, "working_hours": "2"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([result["ok"] for result in response.json()["results"]], [True, False])
+        self.assertEqual(
+            list(Booking.objects.order_by("booking_date").values_list("status", flat=True)),
+            [Booking.CONFIRMED, Booking.PENDING],
+        )
+
+
+# ---------- Event outbox ----------
+class BookingEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client", role="client",
+        )
+        cls.employee = User.objects.create_user(
+            email="employee@example.com", password="pass1234", full_name="Employee", role="employee",
+        )
+        cls.profile = EmployeeProfile.objects.create(user=cls.employee, hourly_rate=100)
+
+    def test_changes_are_logged_and_delivered_once(self):
+        api = APIClient()
+        api.force_authenticate(self.client_user)
+        book_id = api.post("/api/book/create/", {
+            "employee_id": self.profile.id, "booking_date": next_slot(), "job": "Wiring",
+        }, format="json").json()["book_id"]
+        api.force_authenticate(self.employee)
+        api.patch(f"/api/book/update/{book_id}/", {"status": Booking.CONFIRMED}, format="json")
+        self.assertEqual(
+            list(BookingEvent.objects.values_list("kind", flat=True)),
+            [BookingEvent.CREATED, BookingEvent.STATUS_CHANGED],
+        )
+
+        self.assertEqual(drain(), (2, 0))
+        self.assertEqual(drain(), (0, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def make_due(self):
+        BookingEvent.objects.update(next_attempt_at=timezone.now())
+
+    def test_failing_consumer_is_retried_with_backoff(self):
+        event = BookingEvent.objects.create(book_id=uuid.uuid4(), kind=BookingEvent.CREATED)
+        steady = mock.Mock()
+        flaky = mock.Mock(side_effect=[RuntimeError("SMTP down"), RuntimeError("SMTP down"), None])
+
+        with mock.patch.dict(CONSUMERS, {"steady": steady, "flaky": flaky}, clear=True):
+            with self.assertLogs("booking.events", "ERROR"):
+                self.assertEqual(drain(), (0, 1))
+            event.refresh_from_db()
+            self.assertEqual(event.attempts, 1)
+            self.assertAlmostEqual(
+                (event.next_attempt_at - timezone.now()).total_seconds(), 30, delta=5,
+            )
+            self.assertEqual(drain(), (0, 0))  # not due yet
+
+            self.make_due()
+            with self.assertLogs("booking.events", "ERROR"):
+                self.assertEqual(drain(), (0, 1))
+            event.refresh_from_db()
+            self.assertAlmostEqual((event.next_attempt_at - timezone.now()).total_seconds(), 60, delta=5)
+
+            self.make_due()
+            self.assertEqual(drain(), (1, 0))
+
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(steady.call_count, 1)  # delivered on the first try, skipped after
+        self.assertEqual(flaky.call_count, 3)
+        self.assertEqual(set(event.deliveries.values_list("consumer", flat=True)), {"steady", "flaky"})
+
+    @override_settings(BOOKING_EVENT_MAX_ATTEMPTS=2)
+    def test_exhausted_event_is_marked_failed(self):
+        event = BookingEvent.objects.create(book_id=uuid.uuid4(), kind=BookingEvent.CREATED)
+        broken = mock.Mock(side_effect=RuntimeError("SMTP down"))
+        with mock.patch.dict(CONSUMERS, {"broken": broken}, clear=True), self.assertLogs("booking.events", "ERROR"):
+            for _ in range(3):
+                drain()
+                self.make_due()
+        event.refresh_from_db()
+        self.assertEqual((event.attempts, broken.call_count), (2, 2))
+        self.assertIsNotNone(event.failed_at)
+        self.assertIsNone(event.processed_at)
+
+    def test_claimed_events_are_hidden_until_the_claim_expires(self):
+        event = BookingEvent.objects.create(book_id=uuid.uuid4(), kind=BookingEvent.CREATED)
+        self.assertEqual(claim(10), [event])
+        self.assertEqual(claim(10), [])  # another worker
+        self.make_due()  # the first worker died
+        self.assertEqual(claim(10), [event])
+
+
+# ---------- Query plan regression tests ----------
+class BookingListPlanTests(TestCase):
+    """
+    Every booking list query must be answered from an index, in index order:
+    EXPLAIN may show neither a full scan of booking_booking nor a sort. Runs
+    on PostgreSQL and SQLite, on enough rows (and fresh statistics) that the
+    planner would rather scan than use a useless index.
+    """
+    EMPLOYEES = 40
+    CLIENTS = 80
+    BOOKINGS_PER_EMPLOYEE = 150
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create(
+            [User(email=f"employee{i}@example.com", full_name=f"Employee {i}", role="employee")
+             for i in range(cls.EMPLOYEES)]
+            + [User(email=f"client{i}@example.com", full_name=f"Client {i}", role="client")
+               for i in range(cls.CLIENTS)]
+        )
+        cls.employee_users, cls.clients = users[:cls.EMPLOYEES], users[cls.EMPLOYEES:]
+        profiles = EmployeeProfile.objects.bulk_create(
+            [EmployeeProfile(user=user, hourly_rate=100) for user in cls.employee_users]
+        )
+        statuses = [value for value, _ in Booking.STATUS_CHOICES]
+        start = timezone.now() - timedelta(days=365)
+        bookings = []
+        for i in range(cls.BOOKINGS_PER_EMPLOYEE):
+            for j, profile in enumerate(profiles):
+                booking_date = start + timedelta(hours=i * 24 + j % 8)
+                bookings.append(Booking(
+                    client=cls.clients[(i + j) % cls.CLIENTS], employee=profile, job="Wiring",
+                    booking_date=booking_date, end_date=booking_date + timedelta(hours=1),
+                    status=statuses[i % len(statuses)],
+                ))
+        Booking.objects.bulk_create(bookings, batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        self.api = APIClient()
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("EXPLAIN " + sql, params)
+                return [row[0] for row in cursor.fetchall()]
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, sql, params=()):
+        plan = self.explain(sql, params)
+        text = "\n".join(plan)
+        if connection.vendor == "postgresql":
+            full_scans = [line for line in plan if "Seq Scan on booking_booking" in line]
+            sorts = [line for line in plan if "Sort" in line and "Sort Key" not in line]
+        else:
+            full_scans = [line for line in plan if line.startswith("SCAN booking_booking")]
+            sorts = [line for line in plan if "TEMP B-TREE" in line]
+        self.assertFalse(full_scans, f"full scan of booking_booking:\n{sql}\n{text}")
+        self.assertFalse(sorts, f"sort instead of index order:\n{sql}\n{text}")
+
+    def assertListPlans(self, url, user):
+        """Fetch two pages of `url` and check the plan of every booking query they ran."""
+        self.api.force_authenticate(user)
+        checked = 0
+        for page in range(2):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.api.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            for query in ctx.captured_queries:
+                if '"booking_booking"' in query["sql"]:
+                    self.assertIndexedPlan(query["sql"])
+                    checked += 1
+            url = response.json()["next"]
+            if page == 0:
+                self.assertTrue(url, "expected a second page")
+        self.assertEqual(checked, 2)
+
+    def test_client_list(self):
+        self.assertListPlans("/api/book/client/", self.clients[0])
+
+    def test_client_list_by_status(self):
+        self.assertListPlans(f"/api/book/client/?status={Booking.PENDING}&page_size=5", self.clients[0])
+
+    def test_employee_list(self):
+        self.assertListPlans("/api/book/employee/", self.employee_users[0])
+
+    def test_employee_list_by_status(self):
+        self.assertListPlans(f"/api/book/employee/?status={Booking.CONFIRMED}&page_size=5", self.employee_users[0])
+
+    def test_status_listing(self):
+        queryset = Booking.objects.filter(status=Booking.PENDING).order_by("-created_at")[:20]
+        self.assertIndexedPlan(*queryset.query.sql_with_params())
+
+    def test_overlap_check(self):
+        profile = EmployeeProfile.objects.get(user=self.employee_users[0])
+        start = timezone.now()
+        queryset = Booking.objects.active().overlapping(profile, start, start + timedelta(hours=1))
+        self.assertIndexedPlan(*queryset.query.sql_with_params())
+
+
+# ---------- Free slots ----------
+def at(day, hour, minute=0):
+    return local_datetime(day, time(hour, minute)).isoformat()
+
+
+def slot(day, start_hour, end_hour):
+    return [at(day, start_hour), at(day, end_hour)]
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class FreeSlotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.client_user = User.objects.create_user(
+            email="client@example.com", password="pass1234", full_name="Client", role="client",
+        )
+        cls.employee = User.objects.create_user(
+            email="employee@example.com", password="pass1234", full_name="Employee", role="employee",
+        )
+        cls.profile = EmployeeProfile.objects.create(user=cls.employee, hourly_rate=100)
+        cls.days = horizon_days()
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.client_user)
+
+    def work_nine_to_five(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for weekday in range(7):
+                WorkingHours.objects.create(employee=self.profile, weekday=weekday, start_time=time(9), end_time=time(17))
+
+    def free_slots(self, days=4):
+        response = self.api.get(f"/api/book/free-slots/?employees={self.profile.id}&days={days}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()[str(self.profile.id)]
+
+    def test_subtract(self):
+        self.assertEqual(subtract([(9, 12), (13, 17)], [(11, 14), (10, 11), (16, 18)]), [(9, 10), (14, 16)])
+        self.assertEqual(subtract([(9, 17)], []), [(9, 17)])
+        self.assertEqual(subtract([(9, 17)], [(8, 18)]), [])
+        self.assertEqual(subtract([(9, 17)], [(9, 10), (16, 17)]), [(10, 16)])
+
+    def test_exceptions_and_bookings(self):
+        self.work_nine_to_five()
+        today, off, lunch, overtime = self.days[:4]
+        with self.captureOnCommitCallbacks(execute=True):
+            AvailabilityException.objects.create(employee=self.profile, date=off)
+            AvailabilityException.objects.create(
+                employee=self.profile, date=lunch, start_time=time(12), end_time=time(13),
+            )
+            AvailabilityException.objects.create(
+                employee=self.profile, date=overtime, start_time=time(16), end_time=time(20), is_available=True,
+            )
+            Booking.objects.create(
+                client=self.client_user, employee=self.profile, job="Wiring",
+                booking_date=local_datetime(overtime, time(10)), duration_minutes=90,
+            )
+
+        self.assertEqual(self.free_slots(), {
+            today.isoformat(): [slot(today, 9, 17)],
+            off.isoformat(): [],
+            lunch.isoformat(): [slot(lunch, 9, 12), slot(lunch, 13, 17)],
+            overtime.isoformat(): [slot(overtime, 9, 10), [at(overtime, 11, 30), at(overtime, 20)]],
+        })
+
+    def test_reads_never_write(self):
+        self.assertIsNone(self.free_slots())  # no schedule: unknown, not fully booked
+
+        self.work_nine_to_five()
+        FreeSlotDay.objects.filter(day=self.days[1]).delete()  # rolled in, not computed yet
+        with self.assertNumQueries(2):  # the profile ids and the slot rows
+            by_day = self.free_slots()
+        self.assertIsNone(by_day[self.days[1].isoformat()])
+        self.assertEqual(by_day[self.days[0].isoformat()], [slot(self.days[0], 9, 17)])
+        self.assertFalse(FreeSlotDay.objects.filter(day=self.days[1]).exists())
+
+    def test_replacing_the_hours_refreshes_once(self):
+        self.work_nine_to_five()
+        self.api.force_authenticate(self.employee)
+        with mock.patch("booking.signals.refresh_employee") as from_signals, \
+                mock.patch("booking.views.refresh_employee") as from_view:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.api.put("/api/book/availability/", [
+                    {"weekday": 0, "start_time": "08:00", "end_time": "12:00"},
+                ], format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(from_signals.call_count + from_view.call_count, 1)
+        self.assertEqual(WorkingHours.objects.filter(employee=self.profile).count(), 1)
+
+    def test_booking_outside_working_hours_is_rejected(self):
+        self.work_nine_to_five()
+        tomorrow = self.days[1]
+
+        def book(hour, duration=60):
+            return self.api.post("/api/book/create/", {
+                "employee_id": self.profile.id, "booking_date": at(tomorrow, hour),
+                "duration_minutes": duration, "job": "Wiring",
+            }, format="json")
+
+        self.assertEqual(book(9).status_code, 201)
+        for hour, duration in ((7, 60), (16, 120), (18, 60)):
+            response = book(hour, duration)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("booking_date", response.json())
+
+    def test_moving_a_booking_frees_its_old_day(self):
+        self.work_nine_to_five()
+        first, second = self.days[1:3]
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                client=self.client_user, employee=self.profile, job="Wiring",
+                booking_date=local_datetime(first, time(10)), duration_minutes=60,
+            )
+
+        booking = Booking.objects.get(employee=self.profile)
+        booking.booking_date = local_datetime(second, time(10))
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):  # the UPDATE, the old slot is known from the load
+                booking.save()
+
+        by_day = self.free_slots()
+        self.assertEqual(by_day[first.isoformat()], [slot(first, 9, 17)])
+        self.assertEqual(by_day[second.isoformat()], [slot(second, 9, 10), slot(second, 11, 17)])
@@ -0,0 +1,153 @@
+"""
+Booking status state machine; every transition is a conditional UPDATE, so
+of two concurrent changes only the first one wins.
+"""
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from helpers.tasks import submit
+from .availability import booking_days, refresh_days
+from .events import booking_event, record_events
+from .models import Booking, BookingEvent
+
+TRANSITIONS = {
+    Booking.PENDING: (Booking.CONFIRMED, Booking.CANCELED),
+    Booking.CONFIRMED: (Booking.IN_PROGRESS, Booking.CANCELED),
+    Booking.IN_PROGRESS: (Booking.COMPLETED, Booking.INCOMPLETED),
+    Booking.COMPLETED: (),
+    Booking.CANCELED: (),
+    Booking.INCOMPLETED: (),
+}
+
+CENT = Decimal("0.01")
+
+
+class TransitionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "The booking status changed in the meantime. Reload it and try again."
+    default_code = "transition_conflict"
+
+
+def bookings_for_transition():
+    """Only the columns a transition reads (and the status endpoint returns)."""
+    return Booking.objects.only(
+        "book_id", "status", "employee_id", "client_id", "booking_date", "end_date", "amount", "is_paid", "is_completed",
+    ).annotate(hourly_rate=F("employee__hourly_rate"))
+
+
+def completion_amount(hourly_rate, working_hours):
+    return (Decimal(hourly_rate) * Decimal(working_hours)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def transition_changes(current, target, hourly_rate=None, working_hours=None):
+    """Columns to write for `current` -> `target`; ValidationError if the move isn't allowed."""
+    if target not in TRANSITIONS.get(current, ()):
+        raise ValidationError({"status": f"A {current} booking cannot become {target}."})
+    changes = {"status": target}
+    if target == Booking.COMPLETED:
+        if working_hours is None:
+            raise ValidationError({"working_hours": "Working hours are required to complete the job."})
+        changes.update(amount=completion_amount(hourly_rate, working_hours), is_paid=True, is_completed=True)
+    return changes
+
+
+def after_transitions(moved):
+    """
+    Outbox events for `moved` ([(booking, from, to)]) plus post-commit
+    work; call inside the transaction that updated the rows.
+    """
+    record_events([
+        booking_event(booking, BookingEvent.STATUS_CHANGED, **{"from": current, "to": target})
+        for booking, current, target in moved
+    ])
+    freed = defaultdict(set)
+    for booking, current, target in moved:
+        if current in Booking.ACTIVE_STATUSES and target not in Booking.ACTIVE_STATUSES:
+            freed[booking.employee_id].update(booking_days(booking))
+    for employee_id, days in freed.items():
+        transaction.on_commit(lambda employee_id=employee_id, days=days: submit(refresh_days, employee_id, days))
+
+
+def transition(booking, target, working_hours=None):
+    """
+    Move a booking loaded with bookings_for_transition() to `target` and
+    return it updated. Raises ValidationError or TransitionConflict.
+    """
+    current = booking.status
+    changes = transition_changes(current, target, booking.hourly_rate, working_hours)
+    with transaction.atomic():
+        if not Booking.objects.filter(book_id=booking.book_id, status=current).update(**changes):
+            raise TransitionConflict()
+        after_transitions([(booking, current, target)])
+    for name, value in changes.items():
+        setattr(booking, name, value)
+    return booking
+
+
+def bulk_transition(items, bookings):
+    """
+    Apply [{"book_id", "status", "working_hours"?}, ...] to the bookings
+    found in `bookings` (a bookings_for_transition() queryset scoped to what
+    the caller may change). Invalid items are reported and skipped; the
+    valid ones are written together. Returns one result per item, in order.
+    """
+    results = [None] * len(items)
+
+    def fail(index, errors):
+        results[index] = {"book_id": str(items[index]["book_id"]), "ok": False, "errors": errors}
+
+    with transaction.atomic():
+        # Row locks, taken in a fixed order so two batches can't deadlock
+        locked = bookings.filter(book_id__in=[item["book_id"] for item in items])
+        locked = locked.select_for_update(of=("self",)).order_by("book_id")
+        found = {booking.book_id: booking for booking in locked}
+
+        groups = defaultdict(list)  # (from, to) -> [(index, booking, changes)]
+        seen = set()
+        for index, item in enumerate(items):
+            booking = found.get(item["book_id"])
+            if booking is None:
+                fail(index, {"book_id": "Booking not found."})
+                continue
+            if booking.book_id in seen:
+                fail(index, {"book_id": "Listed more than once."})
+                continue
+            seen.add(booking.book_id)
+            try:
+                changes = transition_changes(
+                    booking.status, item["status"], booking.hourly_rate, item.get("working_hours"),
+                )
+            except ValidationError as exc:
+                fail(index, exc.detail)
+                continue
+            groups[(booking.status, item["status"])].append((index, booking, changes))
+
+        moved = []
+        for (current, target), group in groups.items():
+            book_ids = [booking.book_id for _, booking, _ in group]
+            update = {"status": target}
+            if target == Booking.COMPLETED:
+                update.update(
+                    amount=Case(
+                        *[When(book_id=booking.book_id, then=Value(changes["amount"])) for _, booking, changes in group],
+                        output_field=DecimalField(max_digits=10, decimal_places=2),
+                    ),
+                    is_paid=True,
+                    is_completed=True,
+                )
+            # The rows are locked, so this only misses on databases without
+            # row locks (SQLite); give up on the whole batch then
+            if Booking.objects.filter(book_id__in=book_ids, status=current).update(**update) != len(book_ids):
+                raise TransitionConflict()
+            for index, booking, changes in group:
+                for name, value in changes.items():
+                    setattr(booking, name, value)
+                results[index] = {"book_id": str(booking.book_id), "ok": True, "status": target}
+                moved.append((booking, current, target))
+        after_transitions(moved)
+    return results
@@ -1,20 +1,36 @@
 from django.urls import path
 from .views import (
     NearbyEmployeesView,
+    EmployeeSearchView,
+    SkillFacetView,
     GetEmployeeByIdAPIView,
     CreateBookingAPIView,
     EmployeeBookingListAPIView,
     ClientBookingListAPIView,
-    BookingStatusUpdateAPIView
-    
+    BookingStatusUpdateAPIView,
+    BookingRetrieveAPIView,
+    BulkBookingStatusUpdateAPIView,
+    FreeSlotsView,
+    AvailabilityView,
+    AvailabilityExceptionCreateView,
+    AvailabilityExceptionDeleteView,
 )
 
 urlpatterns = [
     path("nearby/", NearbyEmployeesView.as_view(), name="nearby-employees"),
+    path("search/", EmployeeSearchView.as_view(), name="search-employees"),
+    path("skills/", SkillFacetView.as_view(), name="skill-facet"),
     path("employee/<int:user_id>/", GetEmployeeByIdAPIView.as_view(), name="get-user-by-id"),
     
     path("create/", CreateBookingAPIView.as_view(), name="create-booking"),
     path("client/", ClientBookingListAPIView.as_view(), name="client-bookings"),
     path("employee/", EmployeeBookingListAPIView.as_view(), name="employee-bookings"),
+    path("<uuid:book_id>/", BookingRetrieveAPIView.as_view(), name="booking-detail"),
+    path("update/bulk/", BulkBookingStatusUpdateAPIView.as_view(), name="bulk-update-booking-status"),
     path("update/<uuid:book_id>/", BookingStatusUpdateAPIView.as_view(), name="update-booking-status"),
+
+    path("free-slots/", FreeSlotsView.as_view(), name="free-slots"),
+    path("availability/", AvailabilityView.as_view(), name="availability"),
+    path("availability/exceptions/", AvailabilityExceptionCreateView.as_view(), name="availability-exception-create"),
+    path("availability/exceptions/<int:pk>/", AvailabilityExceptionDeleteView.as_view(), name="availability-exception-delete"),
 ]
@@ -3,35 +3,91 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated , AllowAny
 from rest_framework import generics, permissions, status
 from django.contrib.auth import get_user_model
-from django.db.models import F
-from math import radians, sin, cos, sqrt, atan2
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import FloatField, Q, Subquery
+from django.db.models.functions import Cast
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.urls import replace_query_param
 # from rest_framework import status
 from .serializers import (
     NearbyEmployeeSerializer,
+    RankedEmployeeSerializer,
+    EmployeeSearchParamsSerializer,
     UserWithEmployeeSerializer,
     BookingCreateSerializer,
     BookingDetailSerializer,
-    BookingStatusUpdateSerializer
+    BookingListSerializer,
+    BookingStatusUpdateSerializer,
+    BulkBookingStatusUpdateSerializer,
+    WorkingHoursSerializer,
+    AvailabilityExceptionSerializer,
 )
-from .models import Booking
+from .models import Booking, WorkingHours, AvailabilityException
+from .transitions import bookings_for_transition, bulk_transition
+from .availability import SLOT_HORIZON_DAYS, horizon_days, free_slots, refresh_employee
+from helpers.pagination import KeysetPagination
+from helpers.tasks import submit
+from account.models import EmployeeProfile
+from account.skills import parse_skills, filter_by_skills, skill_facet
+from account.locations import employee_locations, employees_within_box, employee_location_rows
+from helpers.distance import nearest
+from .search import rank_employees, encode_cursor, decode_cursor
 
 User = get_user_model()
 
 
-# Haversine formula to calculate distance
-def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371  # KM
-    d_lat = radians(lat2 - lat1)
-    d_lon = radians(lon2 - lon1)
+def users_with_profile():
+    """Users with their employee profile joined in."""
+    return User.objects.select_related('employee_profile')
 
-    a = (sin(d_lat/2) ** 2 +
-         cos(radians(lat1)) * cos(radians(lat2)) * sin(d_lon/2) ** 2)
 
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+def bookings_with_people():
+    """Bookings with both parties (and their profiles) joined in."""
+    return Booking.objects.select_related('client__employee_profile', 'employee__user')
+
+
+# Columns BookingListSerializer reads; the user rows are wide (bio, tokens...)
+BOOKING_LIST_COLUMNS = (
+    'book_id', 'booking_date', 'duration_minutes', 'end_date', 'job', 'status',
+    'is_completed', 'is_paid', 'amount', 'created_at', 'client', 'employee',
+    'client__full_name', 'client__profile_image', 'client__profile_image_variants',
+    'employee__user__full_name', 'employee__user__profile_image', 'employee__user__profile_image_variants',
+)
+
+
+def bookings_for_list():
+    """Bookings with the few party columns a list row shows, in one joined query."""
+    return Booking.objects.select_related('client', 'employee__user').only(*BOOKING_LIST_COLUMNS)
+
+
+def filter_status(queryset, request):
+    """Optional ?status= filter of the booking lists."""
+    value = request.query_params.get("status")
+    if not value:
+        return queryset
+    if value not in dict(Booking.STATUS_CHOICES):
+        raise ValidationError({"status": f"Unknown status: {value}"})
+    return queryset.filter(status=value)
+
+
+DEFAULT_RADIUS_KM = 50
+MAX_RADIUS_KM = 500
+DEFAULT_NEARBY_LIMIT = 50
+MAX_NEARBY_LIMIT = 200
 
 
 class NearbyEmployeesView(APIView):
+    """
+    Employees within `radius` km of the requesting user, nearest first.
+    Optional filters: available=true and skills (comma separated).
+
+    Distances are computed in one vectorized pass over the in-memory employee
+    location snapshot, and only the final page of users is loaded from the
+    database. With EMPLOYEE_LOCATION_SNAPSHOT off, candidates are narrowed in
+    SQL to the geohash cells and bounding box around the user instead.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -40,34 +96,152 @@ class NearbyEmployeesView(APIView):
         if not user.latitude or not user.longitude:
             return Response({"error": "Your location is not set"}, status=400)
 
-        employees = User.objects.filter(role="employee")
+        try:
+            radius = float(request.query_params.get("radius", DEFAULT_RADIUS_KM))
+            limit = int(request.query_params.get("limit", DEFAULT_NEARBY_LIMIT))
+        except ValueError:
+            return Response({"error": "radius and limit must be numbers"}, status=400)
+
+        if not 0 < radius <= MAX_RADIUS_KM:
+            return Response({"error": f"radius must be between 0 and {MAX_RADIUS_KM} km"}, status=400)
+        limit = max(1, min(limit, MAX_NEARBY_LIMIT))
+        available_only = request.query_params.get("available", "").lower() == "true"
+        skills = parse_skills(request.query_params.get("skills"))
+
+        lat, lon = float(user.latitude), float(user.longitude)
+        if settings.EMPLOYEE_LOCATION_SNAPSHOT:
+            user_ids = None
+            if skills:
+                # geohash/box prefilter first, so only nearby matches are loaded
+                candidates = employees_within_box(User.objects.all(), lat, lon, radius)
+                user_ids = filter_by_skills(candidates, skills, prefix="employee_profile__").values_list("id", flat=True)
+            ids, distances = employee_locations.search(
+                lat, lon, radius, limit, available_only=available_only, user_ids=user_ids,
+            )
+        else:
+            ids, distances = self.search_database(lat, lon, radius, limit, available_only, skills)
 
         # Store employee instances so serializer works
+        users = users_with_profile().in_bulk(ids)
         results = []
-
-        for emp in employees:
-            if emp.latitude and emp.longitude:
-                distance = calculate_distance(
-                    float(user.latitude),
-                    float(user.longitude),
-                    float(emp.latitude),
-                    float(emp.longitude)
-                )
-
-                if distance <= 50:
-                    emp.distance_km = round(distance, 2)  # attach value to instance
-                    results.append(emp)
+        for user_id, distance in zip(ids, distances):
+            emp = users.get(user_id)
+            if emp is None:
+                continue  # deleted since the snapshot was refreshed
+            emp.distance_km = round(distance, 2)  # attach value to instance
+            results.append(emp)
 
         serializer = NearbyEmployeeSerializer(results, many=True)
         return Response(serializer.data)
 
+    def search_database(self, lat, lon, radius, limit, available_only, skills):
+        employees = employees_within_box(User.objects.all(), lat, lon, radius)
+        if available_only:
+            employees = employees.filter(employee_profile__available=True)
+        employees = filter_by_skills(employees, skills, prefix="employee_profile__")
+
+        candidates = list(employee_location_rows(employees))
+        if not candidates:
+            return [], []
+
+        ids = [row[0] for row in candidates]
+        positions, distances = nearest(
+            lat, lon, [row[1] for row in candidates], [row[2] for row in candidates],
+            radius_km=radius, k=limit,
+        )
+        return [ids[i] for i in positions], distances.tolist()
+
+
+class EmployeeSearchView(APIView):
+    """
+    Ranked employee search.
+
+    Filters (all optional): radius (km), skills (comma separated, all must
+    match), min_rate / max_rate (hourly), min_rating and available (default
+    true). Filtering and the bounding-box prefilter run in SQL; scoring on
+    distance and rating is one vectorized pass over the remaining rows.
+    Pages are keyset paginated on (score, id) through the `cursor` param.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        if not user.latitude or not user.longitude:
+            return Response({"error": "Your location is not set"}, status=400)
+
+        params = request.query_params
+        filters = EmployeeSearchParamsSerializer(data={key: value for key, value in params.items() if value})
+        try:
+            radius = float(params.get("radius", DEFAULT_RADIUS_KM))
+            limit = int(params.get("limit", DEFAULT_NEARBY_LIMIT))
+            after = decode_cursor(params["cursor"]) if params.get("cursor") else None
+        except ValueError:
+            return Response({"error": "Invalid search parameters"}, status=400)
+        if not filters.is_valid():
+            return Response({"error": "Invalid search parameters", **filters.errors}, status=400)
+        min_rate = filters.validated_data.get("min_rate")
+        max_rate = filters.validated_data.get("max_rate")
+        min_rating = filters.validated_data.get("min_rating")
+
+        if not 0 < radius <= MAX_RADIUS_KM:
+            return Response({"error": f"radius must be between 0 and {MAX_RADIUS_KM} km"}, status=400)
+        limit = max(1, min(limit, MAX_NEARBY_LIMIT))
+
+        lat, lon = float(user.latitude), float(user.longitude)
+        employees = employees_within_box(User.objects.all(), lat, lon, radius)
+        if params.get("available", "true").lower() == "true":
+            employees = employees.filter(employee_profile__available=True)
+        if min_rate is not None:
+            employees = employees.filter(employee_profile__hourly_rate__gte=min_rate)
+        if max_rate is not None:
+            employees = employees.filter(employee_profile__hourly_rate__lte=max_rate)
+        if min_rating is not None:
+            employees = employees.filter(employee_profile__average_rating__gte=min_rating)
+        employees = filter_by_skills(employees, parse_skills(params.get("skills")), prefix="employee_profile__")
+
+        rows = employees.values_list(
+            "id",
+            Cast("latitude", FloatField()),
+            Cast("longitude", FloatField()),
+            Cast("employee_profile__average_rating", FloatField()),
+        )
+        ids, distances, scores, has_more = rank_employees(lat, lon, list(rows), radius, limit, after=after)
+
+        users = users_with_profile().in_bulk(ids)
+        results = []
+        for user_id, distance, score in zip(ids, distances, scores):
+            emp = users.get(user_id)
+            if emp is None:
+                continue
+            emp.distance_km = round(distance, 2)
+            emp.score = score
+            results.append(emp)
+
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "cursor", encode_cursor(scores[-1], ids[-1])
+            )
+        return Response({
+            "next": next_url,
+            "results": RankedEmployeeSerializer(results, many=True).data,
+        })
+
+
+class SkillFacetView(APIView):
+    """Number of employees per skill, for search filters. Served from cache."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(skill_facet())
+
 
 class GetEmployeeByIdAPIView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request, user_id):
         try:
-            user = User.objects.get(id=user_id)
+            user = users_with_profile().get(id=user_id)
         except User.DoesNotExist:
             return Response(
                 {"error": "User not found"},
@@ -95,47 +269,181 @@ class CreateBookingAPIView(generics.CreateAPIView):
 
 
 
+class BookingKeysetPagination(KeysetPagination):
+    ordering = ('-created_at', '-book_id')
+
+
 # ---------- Employee View Their Bookings ----------
 class EmployeeBookingListAPIView(generics.ListAPIView):
-    serializer_class = BookingDetailSerializer
+    serializer_class = BookingListSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingKeysetPagination
 
     def get_queryset(self):
         user = self.request.user
         if user.role != "employee":
             return Booking.objects.none()
-        return Booking.objects.filter(employee=user.employee_profile)
+        # Compare employee_id with a scalar subquery rather than joining on
+        # employee__user: the join makes the planner sort instead of reading
+        # booking_employee_list_idx in order
+        profile = EmployeeProfile.objects.filter(user=user).values('pk')[:1]
+        return filter_status(bookings_for_list().filter(employee=Subquery(profile)), self.request)
 
 
 # ---------- Client View Their Bookings ----------
 class ClientBookingListAPIView(generics.ListAPIView):
+    serializer_class = BookingListSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = BookingKeysetPagination
+
+    def get_queryset(self):
+        return filter_status(bookings_for_list().filter(client=self.request.user), self.request)
+
+
+# ---------- Booking Detail (either party) ----------
+class BookingRetrieveAPIView(generics.RetrieveAPIView):
     serializer_class = BookingDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
+    lookup_field = "book_id"
 
     def get_queryset(self):
-        return Booking.objects.filter(client=self.request.user)
-    
+        user = self.request.user
+        # others' bookings are a 404, not a 403: don't confirm they exist
+        return bookings_with_people().filter(Q(client=user) | Q(employee__user=user))
 
 
 # ---------- Employee Update Booking Status ----------
 class BookingStatusUpdateAPIView(generics.UpdateAPIView):
-    queryset = Booking.objects.all()
+    """
+    Move one of the employee's bookings along the status state machine
+    (booking/transitions.py): one query to load and authorize the booking,
+    one conditional UPDATE.
+    """
     serializer_class = BookingStatusUpdateSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = "book_id"
 
+    def get_queryset(self):
+        # someone else's booking is a 404, like in BookingRetrieveAPIView
+        return bookings_for_transition().filter(employee__user=self.request.user)
+
     def patch(self, request, *args, **kwargs):
-        booking = self.get_object()
-        employee_profile = booking.employee  # EmployeeProfile instance
+        if request.user.role != "employee":
+            return Response({"error": "Only employees can update bookings."}, status=status.HTTP_403_FORBIDDEN)
+        return super().patch(request, *args, **kwargs)
+
+
+class BulkBookingStatusUpdateAPIView(APIView):
+    """
+    Several status changes in one request:
+    {"items": [{"book_id": ..., "status": ..., "working_hours": ...}, ...]}.
+    Employees may change their own bookings, staff any booking. Every item
+    is checked against the state machine; the valid ones are applied in one
+    transaction and each item gets its own result.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user = request.user
+        if user.is_staff:
+            bookings = bookings_for_transition()
+        elif user.role == "employee":
+            bookings = bookings_for_transition().filter(employee__user=user)
+        else:
+            return Response({"error": "Only employees can update bookings."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = BulkBookingStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = bulk_transition(serializer.validated_data["items"], bookings)
+        return Response({"results": results})
+
+
+# ---------- Availability ----------
+MAX_FREE_SLOT_EMPLOYEES = 100
+
+
+class FreeSlotsView(APIView):
+    """
+    Free slots of many employees in one call, for the booking screen:
+    ?employees=1,2,3 (employee profile ids) and optional days (1-7).
+    Read from the precomputed FreeSlotDay rows; an employee without working
+    hours maps to null (availability unknown), and so does a day not
+    computed yet.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            ids = [int(value) for value in request.query_params.get("employees", "").split(",") if value.strip()]
+            days = int(request.query_params.get("days", SLOT_HORIZON_DAYS))
+        except ValueError:
+            return Response({"error": "employees must be a comma separated list of ids"}, status=400)
+        if not ids:
+            return Response({"error": "employees is required"}, status=400)
+        if len(ids) > MAX_FREE_SLOT_EMPLOYEES:
+            return Response({"error": f"At most {MAX_FREE_SLOT_EMPLOYEES} employees per request"}, status=400)
+        days = max(1, min(days, SLOT_HORIZON_DAYS))
+
+        existing = EmployeeProfile.objects.filter(id__in=ids).values_list("id", flat=True)
+        slots = free_slots(list(existing), horizon_days()[:days])
+        return Response({str(employee_id): by_day for employee_id, by_day in slots.items()})
 
-        # ---------- Ensure the request user is the correct employee ----------
-        if request.user.role != "employee" or employee_profile.user != request.user:
-            return Response({"error": "Not alloweddddddd"}, status=status.HTTP_403_FORBIDDEN)
 
-        # ---------- Update booking using serializer ----------
-        response = super().patch(request, *args, **kwargs)
+def own_employee_profile(request):
+    if request.user.role != "employee":
+        return None
+    return EmployeeProfile.objects.filter(user=request.user).first()
 
-        # Refresh updated booking instance
-        booking.refresh_from_db()
 
-        return response
+class AvailabilityView(APIView):
+    """The requesting employee's weekly hours and upcoming exceptions. PUT replaces the weekly hours."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        employee = own_employee_profile(request)
+        if employee is None:
+            return Response({"error": "Only employees have working hours."}, status=403)
+        exceptions = employee.availability_exceptions.filter(date__gte=timezone.localdate())
+        return Response({
+            "working_hours": WorkingHoursSerializer(employee.working_hours.all(), many=True).data,
+            "exceptions": AvailabilityExceptionSerializer(exceptions, many=True).data,
+        })
+
+    def put(self, request):
+        employee = own_employee_profile(request)
+        if employee is None:
+            return Response({"error": "Only employees have working hours."}, status=403)
+        serializer = WorkingHoursSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            # the delete schedules one refresh for the employee (booking/signals.py)
+            deleted, _ = employee.working_hours.all().delete()
+            WorkingHours.objects.bulk_create(
+                [WorkingHours(employee=employee, **row) for row in serializer.validated_data]
+            )
+            if not deleted:
+                # bulk_create sends no signals, so refresh here
+                transaction.on_commit(lambda: submit(refresh_employee, employee.id))
+        return self.get(request)
+
+
+class AvailabilityExceptionCreateView(generics.CreateAPIView):
+    """Add time off or extra working time on a date."""
+    serializer_class = AvailabilityExceptionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        if own_employee_profile(request) is None:
+            return Response({"error": "Only employees have working hours."}, status=403)
+        return super().post(request, *args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(employee=own_employee_profile(self.request))
+
+
+class AvailabilityExceptionDeleteView(generics.DestroyAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return AvailabilityException.objects.filter(employee__user=self.request.user)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from helpers.geo import EARTH_RADIUS_KM
+
+
+def haversine_many(lat, lon, lats, lons):
+    """
+    Great-circle distance in km from one origin to every point in `lats`/`lons`,
+    computed in a single vectorized pass. Missing coordinates (NaN) give NaN.
+    """
+    lat1 = np.radians(lat)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    d_lat = lats - lat1
+    d_lon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+
+    a = np.sin(d_lat / 2) ** 2 + np.cos(lat1) * np.cos(lats) * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def nearest(lat, lon, lats, lons, radius_km=None, k=None):
+    """
+    Positions and distances of the points closest to (lat, lon), nearest first.
+
+    Points farther than `radius_km` (or without coordinates) are dropped and at
+    most `k` results are returned. Top-k uses argpartition, so only the kept
+    points are fully sorted.
+    """
+    distances = haversine_many(lat, lon, lats, lons)
+    if radius_km is None:
+        mask = ~np.isnan(distances)
+    else:
+        mask = distances <= radius_km  # NaN compares False
+    positions = np.flatnonzero(mask)
+
+    if k is not None and positions.size > k:
+        positions = positions[np.argpartition(distances[positions], k - 1)[:k]]
+
+    positions = positions[np.argsort(distances[positions], kind="stable")]
+    return positions, distances[positions]
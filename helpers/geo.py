@@ -0,0 +1,130 @@
+from math import radians, degrees, sin, cos, asin, sqrt, atan2
+
+EARTH_RADIUS_KM = 6371
+
+
+# Haversine formula to calculate distance
+def calculate_distance(lat1, lon1, lat2, lon2):
+    d_lat = radians(lat2 - lat1)
+    d_lon = radians(lon2 - lon1)
+
+    a = (sin(d_lat/2) ** 2 +
+         cos(radians(lat1)) * cos(radians(lat2)) * sin(d_lon/2) ** 2)
+
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return EARTH_RADIUS_KM * c
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Smallest lat/lon box enclosing the circle of `radius_km` around (lat, lon).
+
+    Returns (min_lat, max_lat, min_lon, max_lon). When the box crosses the
+    antimeridian min_lon is greater than max_lon, so callers must OR the two
+    longitude conditions instead of using a single range.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    min_lat = lat - degrees(angular)
+    max_lat = lat + degrees(angular)
+
+    # Circle reaches a pole -> every longitude is inside
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), min(max_lat, 90), -180, 180
+
+    d_lon = degrees(asin(min(1, sin(angular) / cos(radians(lat)))))
+    min_lon = lon - d_lon
+    max_lon = lon + d_lon
+
+    if min_lon < -180:
+        min_lon += 360
+    if max_lon > 180:
+        max_lon -= 360
+    return min_lat, max_lat, min_lon, max_lon
+
+
+# ---------- Geohash ----------
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m cells, precise enough to truncate to any coarser level
+MAX_SEARCH_CELLS = 16
+
+
+def encode_geohash(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """(lat_degrees, lon_degrees) covered by one cell at `precision`."""
+    total_bits = precision * 5
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180 / 2 ** lat_bits, 360 / 2 ** lon_bits
+
+
+def _cells_in_box(min_lat, max_lat, min_lon, max_lon, precision):
+    lat_step, lon_step = geohash_cell_size(precision)
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(encode_geohash(lat, lon, precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + lon_step, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + lat_step, max_lat)
+    return cells
+
+
+def geohash_cells(min_lat, max_lat, min_lon, max_lon, max_cells=MAX_SEARCH_CELLS):
+    """
+    Geohash prefixes whose cells together cover the given bounding box.
+
+    Picks the finest precision that still needs at most `max_cells` cells, so
+    a radius search becomes a handful of indexed prefix lookups.
+    """
+    if min_lon <= max_lon:
+        boxes = [(min_lat, max_lat, min_lon, max_lon)]
+    else:
+        # Box wraps around the antimeridian, cover both halves
+        boxes = [(min_lat, max_lat, min_lon, 180), (min_lat, max_lat, -180, max_lon)]
+
+    best = {""}
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_step, lon_step = geohash_cell_size(precision)
+        estimate = sum(
+            ((box[1] - box[0]) / lat_step + 2) * ((box[3] - box[2]) / lon_step + 2)
+            for box in boxes
+        )
+        if estimate > max_cells * 4:
+            break
+        cells = set()
+        for box in boxes:
+            cells |= _cells_in_box(*box, precision)
+        if len(cells) > max_cells:
+            break
+        best = cells
+    return sorted(best)
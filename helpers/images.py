@@ -0,0 +1,122 @@
+"""
+Resized WebP / JPEG variants of uploaded images, rendered in the background
+and stored in the `<upload field>_variants` JSON field.
+"""
+import mimetypes
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+
+from .storage import derived_names, release_file, remember_derived
+from .tasks import submit
+
+# longest edge in pixels; images are never upscaled
+VARIANT_SIZES = {"thumb": 160, "feed": 720, "full": 1600}
+
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def _encode(image, fmt):
+    pil_format, options = VARIANT_FORMATS[fmt]
+    has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+    if fmt == "jpeg" and has_alpha:
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image.convert("RGBA"), mask=image.convert("RGBA").getchannel("A"))
+        image = background
+    else:
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    # Keep the colour profile only: no EXIF / XMP (GPS position, device ids)
+    image.info = {key: value for key, value in image.info.items() if key == "icc_profile"}
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def render_variants(storage, source):
+    """Write the variants of `source` to `storage` and return their names."""
+    # Blob extensions come from the sniffed type (helpers/storage.py), so
+    # videos and PDFs are skipped here instead of being downloaded for Pillow
+    if not (mimetypes.guess_type(source)[0] or "").startswith("image/"):
+        return {}
+    try:
+        with storage.open(source) as fh:
+            original = Image.open(fh)
+            original = ImageOps.exif_transpose(original)
+            original.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return {}  # not an image (pdf, video) or unreadable
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    variants = {}
+    for name, edge in VARIANT_SIZES.items():
+        resized = original.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        variants[name] = {
+            fmt: storage.save(f"variants/{stem}_{name}.{fmt}", ContentFile(_encode(resized, fmt)))
+            for fmt in VARIANT_FORMATS
+        }
+    return variants
+
+
+def generate_variants(model_label, pk, field_name):
+    model = apps.get_model(model_label)
+    variants_field = f"{field_name}_variants"
+    row = model.objects.filter(pk=pk).values(field_name, variants_field).first()
+    if not row or not row[field_name]:
+        return
+    source, previous = row[field_name], row[variants_field] or {}
+    if previous.get("source") == source:
+        return  # already done
+
+    storage = model._meta.get_field(field_name).storage
+    variants = {"source": source, **render_variants(storage, source)}
+    # Only store them if the upload wasn't replaced in the meantime. The
+    # previous variants go with the previous upload (helpers/storage.py).
+    updated = model.objects.filter(pk=pk, **{field_name: source}).update(**{variants_field: variants})
+    remember_derived(source, derived_names(variants))
+    if not updated:
+        release_file(storage, source, list(derived_names(variants)))
+
+
+def schedule_variants(instance, field_name):
+    """Render variants after commit if the upload changed since they were made."""
+    upload = getattr(instance, field_name)
+    variants = getattr(instance, f"{field_name}_variants") or {}
+    if not upload or variants.get("source") == upload.name:
+        return
+    label = instance._meta.label
+    transaction.on_commit(lambda: submit(generate_variants, label, instance.pk, field_name))
+
+
+class ImageVariantField(serializers.Field):
+    """
+    Read-only URLs of one variant, e.g. {"webp": url, "jpeg": url}, or None
+    while the variants are still being rendered (clients fall back to the
+    original upload). The size comes from the `image_variant` context key,
+    defaulting to the one the field was declared with.
+    """
+
+    def __init__(self, upload_field, variant="feed", **kwargs):
+        self.upload_field = upload_field
+        self.variant = variant
+        kwargs["read_only"] = True
+        kwargs["source"] = "*"
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        upload = getattr(instance, self.upload_field)
+        variants = getattr(instance, f"{self.upload_field}_variants", None) or {}
+        if not upload or variants.get("source") != upload.name:
+            return None
+        names = variants.get(self.context.get("image_variant", self.variant))
+        if not names:
+            return None
+        return {fmt: upload.storage.url(name) for fmt, name in names.items()}
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from helpers.storage import release_file
+from helpers.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = "Retry blob releases that were postponed because an upload reused the blob moments before."
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=settings.MEDIA_RELEASE_GRACE_SECONDS)
+        pending = MediaBlob.objects.filter(release_requested_at__isnull=False, saved_at__lte=cutoff)
+
+        checked = removed = 0
+        for name, derived in pending.values_list("name", "derived").iterator():
+            removed += release_file(default_storage, name, derived)
+            checked += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} blobs, removed {removed}."))
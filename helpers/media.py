@@ -0,0 +1,120 @@
+"""
+Media file serving for local storage, through the front proxy when
+MEDIA_SENDFILE is set and with single Range support otherwise.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import IMMUTABLE_CACHE_CONTROL
+
+HASHED_NAME = re.compile(r"^(?:blobs/[0-9a-f]{2}/[0-9a-f]{2}/|variants/)([0-9a-f]{64}(?:_[a-z]+)?)\.")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+MUTABLE_CACHE_CONTROL = "public, max-age=3600"
+BLOCK_SIZE = 64 * 1024
+
+
+def media_etag(name, stat):
+    match = HASHED_NAME.match(name)
+    if match:
+        return quote_etag(match.group(1))
+    return quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+
+def parse_range(header, size):
+    """(start, end) inclusive for a single `bytes=` range, None to send everything, or False if unsatisfiable."""
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None  # multi-range or malformed: ignored, as RFC 9110 allows
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def stream_file(path, start, length):
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while length > 0:
+            block = fh.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404("Not found")
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Not found")
+
+    etag = media_etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.match(path) else MUTABLE_CACHE_CONTROL
+
+    # 304 on If-None-Match / If-Modified-Since (412 on failed If-Match)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_media_response(request, path, full_path, stat.st_size, etag)
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def build_media_response(request, path, full_path, size, etag):
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding or not content_type:
+        content_type = "application/octet-stream"  # e.g. .gz: don't let clients unpack it
+
+    if settings.MEDIA_SENDFILE == "nginx":
+        response = HttpResponse(content_type=content_type)
+        response.headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + quote(path)
+        return response
+    if settings.MEDIA_SENDFILE == "sendfile":
+        response = HttpResponse(content_type=content_type)
+        response.headers["X-Sendfile"] = full_path
+        return response
+
+    byte_range = None
+    range_header = request.headers.get("Range")
+    if range_header and request.headers.get("If-Range", etag) == etag:
+        byte_range = parse_range(range_header, size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = StreamingHttpResponse(stream_file(full_path, start, length), content_type=content_type)
+    if byte_range:
+        response.status_code = 206
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response.headers["Content-Length"] = str(length)
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
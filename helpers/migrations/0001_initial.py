@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('saved_at', models.DateTimeField(blank=True, null=True)),
+                ('release_requested_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('derived', models.JSONField(blank=True, default=list)),
+            ],
+        ),
+    ]
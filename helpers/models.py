@@ -0,0 +1,20 @@
+from django.db import models
+
+
+class MediaBlob(models.Model):
+    """
+    Lock row of one content-addressed media blob, shared by every app that
+    stores uploads (helpers/storage.py). Storing an upload and releasing a
+    blob both lock it, so a release can't delete a blob an upload has just
+    resolved to.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    # last time an upload resolved to this blob; it isn't deleted within
+    # MEDIA_RELEASE_GRACE_SECONDS of that, while the new row may still commit
+    saved_at = models.DateTimeField(null=True, blank=True)
+    # set when a release had to wait for the grace period (release_media_blobs)
+    release_requested_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    derived = models.JSONField(default=list, blank=True)  # variant names deleted with the blob
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,106 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a (sort field, unique tie-breaker) pair.
+
+    The cursor holds the values of the last row of the page, and the next
+    page is fetched with `WHERE (a, b) < (last_a, last_b)` instead of an
+    OFFSET, so page 10,000 costs the same as page 1 when a matching composite
+    index exists. No COUNT(*) is issued.
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode_cursor(cursor)))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def after(self, values):
+        """Rows strictly after `values` in the configured ordering."""
+        (first, second), (first_value, second_value) = self.ordering, values
+        first_op = 'lt' if first.startswith('-') else 'gt'
+        second_op = 'lt' if second.startswith('-') else 'gt'
+        first_name, second_name = first.lstrip('-'), second.lstrip('-')
+        return (
+            Q(**{f'{first_name}__{first_op}': first_value})
+            | Q(**{first_name: first_value, f'{second_name}__{second_op}': second_value})
+        )
+
+    def encode_cursor(self, obj):
+        values = []
+        for name in self.field_names():
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            names = self.field_names()
+            if not isinstance(raw, list) or len(raw) != len(names):
+                raise ValueError
+            return [
+                self.model._meta.get_field(name).to_python(value)
+                for name, value in zip(names, raw)
+            ]
+        except (binascii.Error, UnicodeDecodeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
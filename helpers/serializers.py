@@ -0,0 +1,56 @@
+from rest_framework import serializers
+from rest_framework.serializers import raise_errors_on_nested_writes
+from rest_framework.utils import model_meta
+
+
+class SparseFieldsMixin:
+    """
+    Let clients pick the top-level fields of a serializer with
+    `?fields=a,b,c`, so a list screen only pays for what it shows. Unknown
+    names are a 400. Nested serializers are returned whole.
+    """
+    fields_query_param = "fields"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        wanted = request.query_params.get(self.fields_query_param) if request else None
+        if not wanted:
+            return
+
+        wanted = {name.strip() for name in wanted.split(",") if name.strip()}
+        unknown = wanted - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {self.fields_query_param: f"Unknown fields: {', '.join(sorted(unknown))}"}
+            )
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+class SubmittedFieldsUpdateMixin:
+    """
+    ModelSerializer.update that saves only the submitted columns (plus
+    auto_now ones), so columns written elsewhere with QuerySet.update()
+    (counters, image variants, rating aggregates) are never written back
+    from a stale instance.
+    """
+
+    def update(self, instance, validated_data):
+        raise_errors_on_nested_writes('update', self, validated_data)
+        info = model_meta.get_field_info(instance)
+        columns = {field.name: field for field in instance._meta.concrete_fields}
+
+        many = {}
+        for attr, value in validated_data.items():
+            if attr in info.relations and info.relations[attr].to_many:
+                many[attr] = value
+            else:
+                setattr(instance, attr, value)
+        update_fields = [attr for attr in validated_data if attr in columns]
+        update_fields += [name for name, field in columns.items() if getattr(field, 'auto_now', False)]
+        instance.save(update_fields=update_fields)
+
+        for attr, value in many.items():
+            getattr(instance, attr).set(value)
+        return instance
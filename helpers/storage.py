@@ -0,0 +1,241 @@
+"""
+Content-addressed media storage: uploads are stored once as
+`blobs/ab/cd/<sha256><ext>` and deleted only when no MEDIA_FIELDS row uses
+them any more (release_file).
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+from datetime import timedelta
+from urllib.parse import urljoin
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from .uploads import EXTENSIONS, sniff_file, strip_metadata
+
+# Every file field that may reference a blob, as "app_label.Model.field"
+MEDIA_FIELDS = [
+    "account.User.profile_image",
+    "posts.Post.post",
+    "booking.Complaint.attachment",
+]
+
+# Lock row of each blob, see release_file
+MEDIA_BLOB_MODEL = "helpers.MediaBlob"
+
+# Blob names never change content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashedStorageMixin:
+    content_addressed = True
+    blob_prefix = "blobs"
+    derived_prefix = "variants/"
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+
+        if name.startswith(self.derived_prefix):
+            # Derived names are unique per source blob, so existing means identical
+            if self.exists(name):
+                return name
+            return super().save(name, content, max_length)
+
+        content_type = sniff_file(content)
+        content = strip_metadata(content, content_type)
+        digest = content_hash(content)
+        extension = EXTENSIONS.get(content_type) or os.path.splitext(name)[1].lower()
+        hashed = f"{self.blob_prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+        with transaction.atomic():
+            lock_blob(hashed, saved=True)
+            if self.exists(hashed):
+                return hashed
+            return super().save(hashed, content, max_length)
+
+
+@deconstructible(path="helpers.storage.HashedFileSystemStorage")
+class HashedFileSystemStorage(HashedStorageMixin, FileSystemStorage):
+    pass
+
+
+@deconstructible(path="helpers.storage.HashedS3Storage")
+class HashedS3Storage(HashedStorageMixin, Storage):
+    """
+    Minimal S3 backend on boto3 (optional dependency, only needed when this
+    backend is selected). Works against AWS or any S3-compatible endpoint such
+    as MinIO, set through MEDIA_S3_ENDPOINT_URL.
+    """
+
+    def __init__(self, bucket=None, endpoint_url=None, region_name=None, base_url=None, client=None):
+        self.bucket = bucket or settings.MEDIA_S3_BUCKET
+        self.base_url = base_url or settings.MEDIA_URL
+        if client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise ImproperlyConfigured("HashedS3Storage requires boto3: pip install boto3")
+            client = boto3.client(
+                "s3",
+                endpoint_url=endpoint_url or settings.MEDIA_S3_ENDPOINT_URL,
+                region_name=region_name or settings.MEDIA_S3_REGION,
+            )
+        self.client = client
+        self.client_error = client.exceptions.ClientError
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=name)
+        except self.client_error as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def _open(self, name, mode="rb"):
+        spooled = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        self.client.download_fileobj(self.bucket, name, spooled)
+        spooled.seek(0)
+        return File(spooled, name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self.client.upload_fileobj(
+            content, self.bucket, name,
+            ExtraArgs={"ContentType": content_type, "CacheControl": IMMUTABLE_CACHE_CONTROL},
+        )
+        return name
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket, Key=name)
+
+    def size(self, name):
+        return self._head(name)["ContentLength"]
+
+    def get_modified_time(self, name):
+        return self._head(name)["LastModified"]
+
+    def url(self, name):
+        return urljoin(self.base_url, name)
+
+
+# ---------- Reference counted deletion ----------
+def file_in_use(name):
+    for path in MEDIA_FIELDS:
+        app_label, model_name, field_name = path.split(".")
+        model = apps.get_model(app_label, model_name)
+        if model._default_manager.filter(**{field_name: name}).exists():
+            return True
+    return False
+
+
+def derived_names(variants):
+    """Storage names inside a variants dict (see helpers/images.py)."""
+    for key, value in (variants or {}).items():
+        if key == "source":
+            continue
+        if isinstance(value, dict):
+            yield from derived_names(value)
+        elif value:
+            yield value
+
+
+def lock_blob(name, saved=False):
+    """Lock the MediaBlob row of `name` for the current transaction, creating it if needed."""
+    model = apps.get_model(MEDIA_BLOB_MODEL)
+    blob, created = model._default_manager.select_for_update().get_or_create(name=name)
+    if saved:
+        blob.saved_at = timezone.now()
+        blob.save(update_fields=["saved_at"])
+    return blob
+
+
+def remember_derived(name, derived):
+    """Note the files derived from blob `name`, so any release deletes them too."""
+    model = apps.get_model(MEDIA_BLOB_MODEL)
+    model._default_manager.filter(name=name).update(derived=sorted(derived))
+
+
+def release_file(storage, name, derived=()):
+    """
+    Delete `name` and the files derived from it unless a row still uses it.
+    Call it after the row letting go of it committed. Returns whether it was deleted.
+    """
+    if not name:
+        return False
+    grace = timedelta(seconds=settings.MEDIA_RELEASE_GRACE_SECONDS)
+    with transaction.atomic():
+        blob = lock_blob(name)
+        if file_in_use(name):
+            if blob.release_requested_at:
+                blob.release_requested_at = None
+                blob.save(update_fields=["release_requested_at"])
+            return False
+        now = timezone.now()
+        derived = sorted(set(blob.derived) | set(derived))
+        if blob.saved_at and blob.saved_at > now - grace:
+            # An upload resolved to this blob moments ago and its row may not
+            # have committed yet; release_media_blobs retries after the grace
+            blob.release_requested_at, blob.derived = now, derived
+            blob.save(update_fields=["release_requested_at", "derived"])
+            return False
+        storage.delete(name)
+        for derived_name in derived:
+            storage.delete(derived_name)
+        blob.delete()
+    return True
+
+
+def _media_fields(instance, field_name):
+    variants_field = f"{field_name}_variants"
+    has_variants = any(field.name == variants_field for field in instance._meta.concrete_fields)
+    return field_name, variants_field if has_variants else None
+
+
+def remember_media(instance, field_name, update_fields=None):
+    """pre_save: note the stored upload so release_media can tell if it was replaced."""
+    if instance._state.adding or (update_fields is not None and field_name not in update_fields):
+        return
+    field_name, variants_field = _media_fields(instance, field_name)
+    columns = [field_name] + ([variants_field] if variants_field else [])
+    row = type(instance)._default_manager.filter(pk=instance.pk).values(*columns).first()
+    if row:
+        instance.__dict__.setdefault("_stored_media", {})[field_name] = row
+
+
+def release_media(instance, field_name, deleted=False):
+    """post_save / post_delete: release the upload the row no longer points at."""
+    field_name, variants_field = _media_fields(instance, field_name)
+    storage = instance._meta.get_field(field_name).storage
+    current = getattr(instance, field_name).name or None
+
+    if deleted:
+        name, variants = current, getattr(instance, variants_field) if variants_field else None
+    else:
+        row = instance.__dict__.get("_stored_media", {}).pop(field_name, None)
+        if row is None or (row[field_name] or None) == current:
+            return
+        name, variants = row[field_name], row.get(variants_field)
+
+    derived = list(derived_names(variants))
+    transaction.on_commit(lambda: release_file(storage, name, derived))
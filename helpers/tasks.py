@@ -0,0 +1,39 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS, thread_name_prefix="background"
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background task %s failed", func.__name__)
+    finally:
+        # Worker threads get their own DB connections, don't leak them
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """
+    Run `func` on the in-process worker pool so it doesn't hold up the
+    request. With BACKGROUND_TASKS_EAGER (tests) it runs inline instead.
+    Call it from transaction.on_commit so workers see committed rows.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        return func(*args, **kwargs)
+    return get_executor().submit(_run, func, args, kwargs)
@@ -0,0 +1,141 @@
+"""
+Upload guards: content sniffing and size limits that work on the stream
+instead of on a fully buffered request, and metadata stripping for the
+images that are stored and served as uploaded.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# (offset, magic bytes, content type). Decided from the bytes, never from the
+# client supplied name or Content-Type header.
+SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\x1a\x45\xdf\xa3", "video/webm"),
+    (4, b"ftypqt", "video/quicktime"),
+    (4, b"ftyp", "video/mp4"),
+]
+SNIFF_BYTES = 16
+
+# Stored blobs take their extension from the sniffed type, not the client name
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "application/pdf": ".pdf",
+    "video/webm": ".webm",
+    "video/quicktime": ".mov",
+    "video/mp4": ".mp4",
+}
+
+# Formats re-encoded by strip_metadata
+STRIPPED_FORMATS = {"image/jpeg": "JPEG", "image/png": "PNG", "image/webp": "WEBP"}
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment")
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Upload is too large."
+    default_code = "upload_too_large"
+
+
+def sniff_content_type(head):
+    """Content type of a file from its first SNIFF_BYTES bytes, or None if not allowed."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for offset, magic, content_type in SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return content_type
+    return None
+
+
+def sniff_file(uploaded):
+    head = uploaded.read(SNIFF_BYTES)
+    uploaded.seek(0)
+    return sniff_content_type(head)
+
+
+def has_metadata(image):
+    return bool(image.getexif()) or any(key in image.info for key in METADATA_KEYS) \
+        or bool(getattr(image, "text", None))
+
+
+def strip_metadata(content, content_type):
+    """
+    Re-encode a JPEG / PNG / WebP without EXIF, XMP or text chunks (GPS
+    position, camera serials), with its orientation applied. Returns
+    `content` itself when there is nothing to strip or it can't be decoded.
+    """
+    pil_format = STRIPPED_FORMATS.get(content_type)
+    if pil_format is None:
+        return content
+    try:
+        content.seek(0)
+        image = Image.open(content)
+        if getattr(image, "is_animated", False) and pil_format != "JPEG":
+            return content  # re-encoding would drop the frames
+        if not has_metadata(image):
+            return content
+        icc_profile = image.info.get("icc_profile")
+        options = {"quality": "keep", "subsampling": "keep"} if pil_format == "JPEG" else {}
+        if image.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+            image = ImageOps.exif_transpose(image)
+            options = {"quality": 90} if pil_format == "JPEG" else {}
+        elif image.format != pil_format:
+            options = {}  # e.g. MPO: quality "keep" needs a plain JPEG
+        if pil_format == "WEBP":
+            options = {"quality": 90}
+        image.info = {}
+        if icc_profile:
+            options["icc_profile"] = icc_profile
+        buffer = BytesIO()
+        image.save(buffer, pil_format, **options)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return content
+    finally:
+        content.seek(0)
+    return ContentFile(buffer.getvalue(), name=content.name)
+
+
+def copy_stream(source, target, length, block_size=64 * 1024):
+    """Copy at most `length` bytes from a request stream; returns the number copied."""
+    copied = 0
+    while copied < length:
+        block = source.read(min(block_size, length - copied))
+        if not block:
+            break
+        target.write(block)
+        copied += len(block)
+    return copied
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Abort a multipart upload as soon as it passes POST_UPLOAD_MAX_BYTES,
+    instead of spooling the whole body to disk first. Insert it in front of
+    the default handlers, before request.data is touched.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > settings.POST_UPLOAD_MAX_BYTES + 64 * 1024:
+            raise UploadTooLarge()  # declared size alone is too big (+ form overhead)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_UPLOAD_MAX_BYTES:
+            raise UploadTooLarge()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -0,0 +1,150 @@
+"""
+Precomputed home feed: new posts are pushed into their readers' FeedEntry
+rows, posts of very active authors are merged in at read time.
+"""
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from helpers.pagination import KeysetPagination
+from helpers.tasks import submit
+from .models import FeedEntry, FeedSubscriber, Like, Post
+
+# last_read_at is only bumped when older than this, so reads don't all write
+READ_TOUCH_INTERVAL = timedelta(hours=1)
+
+
+def is_hot_author(user_id):
+    since = timezone.now() - timedelta(days=1)
+    recent = Post.objects.filter(user_id=user_id, created_at__gte=since).count()
+    return recent > settings.FEED_HOT_AUTHOR_DAILY_POSTS
+
+
+def trim_feeds(user_ids):
+    """Evict everything beyond the newest FEED_MAX_ENTRIES of each feed."""
+    ranked = (
+        FeedEntry.objects.filter(user_id__in=user_ids)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F('user_id'),
+            order_by=(F('published_at').desc(), F('post_id').desc()),
+        ))
+        .filter(rank__gt=settings.FEED_MAX_ENTRIES)
+        .values_list('pk', flat=True)
+    )
+    FeedEntry.objects.filter(pk__in=list(ranked)).delete()
+
+
+def fan_out_post(post_id):
+    post = Post.objects.filter(pk=post_id).values('user_id', 'created_at').first()
+    if post is None or is_hot_author(post['user_id']):
+        return
+
+    active_since = timezone.now() - timedelta(days=settings.FEED_ACTIVE_DAYS)
+    subscribers = (
+        FeedSubscriber.objects.filter(last_read_at__gte=active_since)
+        .exclude(user_id=post['user_id'])
+        .order_by('user_id')
+        .values_list('user_id', flat=True)
+    )
+    last_id = 0
+    while True:
+        batch = list(subscribers.filter(user_id__gt=last_id)[:settings.FEED_FANOUT_BATCH_SIZE])
+        if not batch:
+            break
+        with transaction.atomic():
+            FeedEntry.objects.bulk_create(
+                [FeedEntry(user_id=user_id, post_id=post_id, published_at=post['created_at']) for user_id in batch],
+                ignore_conflicts=True,
+            )
+            trim_feeds(batch)
+        last_id = batch[-1]
+
+    Post.objects.filter(pk=post_id).update(fanned_out=True)
+
+
+def schedule_fan_out(post):
+    """Fan the post out in the background once the creating transaction commits."""
+    transaction.on_commit(lambda: submit(fan_out_post, post.pk))
+
+
+def rebuild_feed(user):
+    latest = (
+        Post.objects.filter(fanned_out=True)
+        .exclude(user=user)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:settings.FEED_MAX_ENTRIES]
+    )
+    with transaction.atomic():
+        FeedEntry.objects.filter(user=user).delete()
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user=user, post_id=pk, published_at=created_at) for pk, created_at in latest],
+            ignore_conflicts=True,
+        )
+
+
+def touch_subscription(user):
+    """Mark the user as an active reader, rebuilding the feed if they were not one."""
+    now = timezone.now()
+    subscription = FeedSubscriber.objects.filter(user=user).first()
+    if subscription is None or subscription.last_read_at < now - timedelta(days=settings.FEED_ACTIVE_DAYS):
+        # Subscribe before rebuilding so a concurrent fan-out can't fall in the gap
+        FeedSubscriber.objects.update_or_create(user=user, defaults={'last_read_at': now})
+        rebuild_feed(user)
+    elif subscription.last_read_at < now - READ_TOUCH_INTERVAL:
+        FeedSubscriber.objects.filter(user=user).update(last_read_at=now)
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Keyset pages over the materialized feed merged with the posts that were
+    never fanned out. Both sides are ordered by (publish time, post id), so
+    one cursor covers both.
+    """
+    ordering = ('-published_at', '-post_id')
+
+    def paginate_feed(self, user, request):
+        self.request = request
+        self.model = FeedEntry
+        self.page_size = self.get_page_size(request)
+        touch_subscription(user)
+
+        entries = (
+            FeedEntry.objects.filter(user=user)
+            .select_related('post__user')
+            .annotate(is_liked_by_me=Exists(Like.objects.filter(user=user, post=OuterRef('post_id'))))
+        )
+        pulled = Post.objects.filter(fanned_out=False).exclude(user=user).with_viewer(user).select_related('user')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            published_at, post_id = self.decode_cursor(cursor)
+            entries = entries.filter(self.after((published_at, post_id)))
+            pulled = pulled.filter(
+                Q(created_at__lt=published_at) | Q(created_at=published_at, id__lt=post_id)
+            )
+
+        limit = self.page_size + 1
+        pushed = []
+        for entry in entries.order_by(*self.ordering)[:limit]:
+            entry.post.is_liked_by_me = entry.is_liked_by_me
+            pushed.append((entry.published_at, entry.post_id, entry.post))
+        pulled = ((p.created_at, p.id, p) for p in pulled.order_by('-created_at', '-id')[:limit])
+
+        page, seen = [], set()
+        # A post being fanned out right now can show up on both sides
+        for published_at, post_id, post in heapq.merge(pushed, pulled, key=lambda row: row[:2], reverse=True):
+            if post_id not in seen:
+                seen.add(post_id)
+                page.append((published_at, post_id, post))
+            if len(page) == limit:
+                break
+
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last = FeedEntry(published_at=page[-1][0], post_id=page[-1][1]) if page else None
+        return [post for _, _, post in page]
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from posts.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete chunked upload sessions idle for longer than UPLOAD_SESSION_TTL_HOURS, with their partial files."
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+
+        removed = 0
+        for session in stale.iterator():
+            if session.status == UploadSession.OPEN:
+                session.discard_part()
+            session.delete()
+            removed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} upload sessions."))
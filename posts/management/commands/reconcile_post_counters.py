@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute like_count / comment_count of posts from the Like and Comment tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ids = Post.objects.order_by("pk").values_list("pk", flat=True)
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            # Short transactions so like/comment writes aren't blocked for long
+            with transaction.atomic():
+                updated += Post.objects.filter(pk__in=batch).recount()
+            last_pk = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled counters for {updated} posts."))
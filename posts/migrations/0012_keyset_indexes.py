@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:38
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_alter_comment_created_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='posts_comme_post_id_06cfd5_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='posts_post_user_id_1547df_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='posts_post_created_dadbfe_idx',
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created_at', '-id'], name='posts_comment_post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-created_at', '-id'], name='posts_post_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='posts_post_user_feed_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Like = apps.get_model('posts', 'Like')
+    Comment = apps.get_model('posts', 'Comment')
+
+    likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('id'))
+    comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('id'))
+    Post.objects.update(
+        like_count=Coalesce(Subquery(likes.values('total')), 0),
+        comment_count=Coalesce(Subquery(comments.values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-like_count', '-id'], name='posts_post_popular_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    Like = apps.get_model('posts', 'Like')
+    Post = apps.get_model('posts', 'Post')
+
+    duplicates = (
+        Like.objects.values('user', 'post')
+        .annotate(keep=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    affected_posts = set()
+    for row in duplicates:
+        Like.objects.filter(user=row['user'], post=row['post']).exclude(id=row['keep']).delete()
+        affected_posts.add(row['post'])
+
+    if affected_posts:
+        likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('id'))
+        Post.objects.filter(pk__in=affected_posts).update(
+            like_count=Coalesce(Subquery(likes.values('total')), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='like',
+            name='posts_like_user_id_842d1b_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='posts_like_unique_user_post'),
+        ),
+    ]
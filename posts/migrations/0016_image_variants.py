@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_feed_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='post_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
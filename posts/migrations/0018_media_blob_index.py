@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='post',
+            field=models.FileField(db_index=True, upload_to=''),
+        ),
+    ]
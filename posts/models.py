@@ -1,5 +1,10 @@
-from datetime import datetime
+import os
+import uuid
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Count, Exists, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from account.models import User
@@ -7,16 +12,56 @@ from account.models import User
 # Create your models here.
 
 
+COUNTER_FIELDS = {'like_count', 'comment_count'}
+
+
+class PostQuerySet(models.QuerySet):
+    def recount(self, fields=COUNTER_FIELDS):
+        """Recompute like_count / comment_count from the Like and Comment tables."""
+        sources = {'like_count': Like, 'comment_count': Comment}
+        counts = {}
+        for field in fields:
+            rows = sources[field].objects.filter(post=OuterRef('pk')).order_by().values('post')
+            counts[field] = Coalesce(Subquery(rows.annotate(total=Count('id')).values('total')), 0)
+        return self.update(**counts)
+
+    def with_viewer(self, user):
+        """Annotate `is_liked_by_me` for `user` in the same query as the posts."""
+        if not user.is_authenticated:
+            return self.annotate(is_liked_by_me=Value(False))
+        return self.annotate(is_liked_by_me=Exists(Like.objects.filter(user=user, post=OuterRef('pk'))))
+
+
 class Post(models.Model):
-    post = models.FileField() # post image
+    post = models.FileField(db_index=True) # post image; indexed for blob reference checks (helpers/storage.py)
+    # Resized renditions of `post`, filled in the background (helpers/images.py)
+    post_variants = models.JSONField(default=dict, blank=True, editable=False)
     title = models.CharField(max_length=200, null=True, blank=True)
     description = models.TextField(max_length=600, null=True, blank=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
-    created_at = models.DateTimeField(auto_now=True)
+    # Publish time, never changes: keyset cursors and the feed are ordered on it
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, updated with F() expressions by the like/comment views
+    like_count = models.PositiveIntegerField(default=0, editable=False)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    # Set once the post has been pushed into subscribers' feeds (posts/feed.py);
+    # posts that never are (feed engine off, hot authors) are merged in at read time
+    fanned_out = models.BooleanField(default=False, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         indexes = [
-            models.Index(fields=['user']),
-            models.Index(fields=['created_at']),
+            # keyset pagination on (created_at, id), globally and per author
+            models.Index(fields=['-created_at', '-id'], name='posts_post_feed_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='posts_post_user_feed_idx'),
+            # "most liked" ordering
+            models.Index(fields=['-like_count', '-id'], name='posts_post_popular_idx'),
+            # fan-out-on-read side of the feed
+            models.Index(
+                fields=['-created_at', '-id'], condition=Q(fanned_out=False), name='posts_post_pull_idx'
+            ),
         ]
 
 
@@ -33,8 +78,11 @@ class Like(models.Model):
     def __str__(self):
         return f"Liked by {self.user.username} on post {self.post.id}"
     class Meta:
+        constraints = [
+            # one like per user and post; also serves lookups by user
+            models.UniqueConstraint(fields=['user', 'post'], name='posts_like_unique_user_post'),
+        ]
         indexes = [
-            models.Index(fields=['user']),
             models.Index(fields=['post']),
         ]
 
@@ -44,14 +92,84 @@ class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField()
-    created_at = models.DateTimeField(default=datetime.now())
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         indexes = [
             models.Index(fields=['user']),
-            models.Index(fields=['post']),
+            models.Index(fields=['post', '-created_at', '-id'], name='posts_comment_post_feed_idx'),
+        ]
+
+
+    def __str__(self):
+        return f"Comment by {self.user.username} on post {self.post.id}"
+
+
+class FeedEntry(models.Model):
+    """A post materialized into one user's home feed, ranked by publish time."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="feed_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="+")
+    published_at = models.DateTimeField()  # feed score: the post's created_at, which never changes
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='posts_feedentry_unique_user_post'),
         ]
+        indexes = [
+            models.Index(fields=['user', '-published_at', '-post'], name='posts_feedentry_read_idx'),
+        ]
+
+    def __str__(self):
+        return f"Post {self.post_id} in feed of {self.user_id}"
+
 
+class FeedSubscriber(models.Model):
+    """Users who read their feed recently enough to have new posts pushed to them."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name="feed_subscription")
+    last_read_at = models.DateTimeField(db_index=True)
 
     def __str__(self):
-        return f"Comment by {self.user.username} on post {self.post.id}"
\ No newline at end of file
+        return f"Feed of {self.user_id}"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of a post file. Chunks are appended to a
+    partial file under UPLOAD_SESSION_DIR, and the file moves to media storage
+    when the upload completes.
+    """
+    OPEN = 'open'
+    COMPLETE = 'complete'
+
+    STATUS_CHOICES = (
+        (OPEN, 'Open'),
+        (COMPLETE, 'Complete'),
+    )
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()  # declared by the client up front
+    received = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True)  # sniffed from the first chunk
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=OPEN)
+    post = models.ForeignKey(Post, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received}/{self.size})"
+
+    @property
+    def part_path(self):
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f"{self.id}.part")
+
+    def discard_part(self):
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
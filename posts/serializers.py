@@ -1,21 +1,40 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Post, Like, Comment
+from helpers.images import ImageVariantField
+from helpers.serializers import SubmittedFieldsUpdateMixin
+from helpers.uploads import sniff_file
+from .models import Post, Like, Comment, UploadSession
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SubmittedFieldsUpdateMixin, serializers.ModelSerializer):
+    # saves only what was sent: counters, fan-out and variants are written elsewhere
     user = serializers.StringRelatedField(read_only=True)
-    likes_count = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
+    likes_count = serializers.IntegerField(source='like_count', read_only=True)
+    comments_count = serializers.IntegerField(source='comment_count', read_only=True)
+    is_liked_by_me = serializers.SerializerMethodField()
+    post_image = ImageVariantField('post', variant='feed')
 
     class Meta:
         model = Post
-        fields = ['id', 'title', 'description', 'post', 'user', 'likes_count', 'comments_count', 'created_at']
-
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+        fields = ['id', 'title', 'description', 'post', 'post_image', 'user', 'likes_count', 'comments_count', 'is_liked_by_me', 'created_at', 'updated_at']
+
+    def get_is_liked_by_me(self, obj):
+        # Listings annotate this with Post.objects.with_viewer(); single posts
+        # fall back to a lookup for the `viewer` passed in the context
+        liked = getattr(obj, 'is_liked_by_me', None)
+        if liked is not None:
+            return liked
+        viewer = self.context.get('viewer')
+        if viewer is None or not viewer.is_authenticated:
+            return False
+        return Like.objects.filter(user=viewer, post=obj).exists()
+
+    def validate_post(self, value):
+        if value.size > settings.POST_UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError("File is too large.")
+        if sniff_file(value) is None:
+            raise serializers.ValidationError("Unsupported file type.")
+        return value
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -26,6 +45,15 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'post', 'user', 'text', 'created_at']
 
 
+class LikeActionSerializer(serializers.Serializer):
+    post = serializers.IntegerField()
+    liked = serializers.BooleanField()
+
+
+class LikeBatchSerializer(serializers.Serializer):
+    actions = LikeActionSerializer(many=True, allow_empty=False, max_length=100)
+
+
 class LikeSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
 
@@ -34,33 +62,28 @@ class LikeSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'post', 'created_at']
 
 
+# ---------- Chunked uploads ----------
+class UploadInitSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
 
+    def validate_size(self, value):
+        if value > settings.POST_UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError("File is too large.")
+        return value
 
 
+class UploadCompleteSerializer(serializers.Serializer):
+    title = serializers.CharField(max_length=200, required=False, allow_blank=True, allow_null=True)
+    description = serializers.CharField(max_length=600, required=False, allow_blank=True, allow_null=True)
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
 
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'received', 'content_type', 'status', 'post', 'chunk_size']
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_CHUNK_MAX_BYTES
@@ -0,0 +1,29 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from helpers.images import schedule_variants
+from helpers.storage import remember_media, release_media
+from .models import Post
+
+
+# ---------- Post image variants ----------
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "post" in update_fields:
+        schedule_variants(instance, "post")
+
+
+# ---------- Media blob cleanup ----------
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, update_fields=None, **kwargs):
+    remember_media(instance, "post", update_fields)
+
+
+@receiver(post_save, sender=Post)
+def post_file_replaced(sender, instance, **kwargs):
+    release_media(instance, "post")
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    release_media(instance, "post", deleted=True)
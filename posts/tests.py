@@ -1,3 +1,507 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from account.models import User
+from helpers.images import render_variants
+from helpers.media import parse_range
+from helpers.models import MediaBlob
+from helpers.storage import HashedS3Storage, derived_names, release_file
+from PIL import ExifTags, Image
+from .feed import fan_out_post
+from .models import FeedEntry, FeedSubscriber, Like, Post, UploadSession
+
+
+def make_post(user, minutes_ago, **fields):
+    post = Post.objects.create(user=user, post=f"blobs/{user.pk}-{minutes_ago}.jpg", title="Post", **fields)
+    Post.objects.filter(pk=post.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+    post.refresh_from_db()
+    return post
+
+
+def make_jpeg(size=(40, 20), **exif_tags):
+    exif = Image.Exif()
+    for tag, value in exif_tags.items():
+        exif[ExifTags.Base[tag]] = value
+    buffer = BytesIO()
+    options = {"exif": exif.tobytes()} if exif_tags else {}
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, "JPEG", **options)
+    return buffer.getvalue()
+
+
+class TemporaryMediaMixin:
+    """Media stored in a throwaway MEDIA_ROOT, with variants rendered inline."""
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(
+            MEDIA_ROOT=media.name, UPLOAD_SESSION_DIR=os.path.join(media.name, "uploads"), BACKGROUND_TASKS_EAGER=True,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+# ---------- Keyset pagination ----------
+class PostCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            email="reader@example.com", password="pass1234", full_name="Reader", role="employee",
+        )
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass1234", full_name="Author", role="employee",
+        )
+        cls.posts = [make_post(cls.author, minutes) for minutes in range(1, 8)]  # newest first
+
+    def test_editing_a_post_keeps_its_place(self):
+        api = APIClient()
+        api.force_authenticate(self.reader)
+        first = api.get("/api/post/all-posts/").json()
+        self.assertEqual([post["id"] for post in first["results"]], [post.id for post in self.posts[:5]])
+
+        # edit a post already read and one still ahead of the cursor
+        api.force_authenticate(self.author)
+        for post in (self.posts[0], self.posts[6]):
+            response = api.put(f"/api/post/posts/{post.id}/", {"title": "Edited"}, format="multipart")
+            self.assertEqual(response.status_code, 200, response.content)
+
+        api.force_authenticate(self.reader)
+        second = api.get(first["next"]).json()
+        self.assertEqual([post["id"] for post in second["results"]], [post.id for post in self.posts[5:]])
+        edited = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual(edited.created_at, self.posts[0].created_at)
+        self.assertGreater(edited.updated_at, edited.created_at)
+
+    def test_editing_a_post_keeps_background_columns(self):
+        post = self.posts[0]
+        # counters and variants written while the edit is in flight
+        Post.objects.filter(pk=post.pk).update(like_count=3, comment_count=2, post_variants={"thumb": "variants/t.webp"})
+        api = APIClient()
+        api.force_authenticate(self.author)
+        response = api.put(f"/api/post/posts/{post.id}/", {"title": "Edited"}, format="multipart")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        edited = Post.objects.get(pk=post.pk)
+        self.assertEqual(edited.title, "Edited")
+        self.assertEqual((edited.like_count, edited.comment_count), (3, 2))
+        self.assertEqual(edited.post_variants, {"thumb": "variants/t.webp"})
+
+
+# ---------- Likes ----------
+class LikeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            email="reader@example.com", password="pass1234", full_name="Reader", role="client",
+        )
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass1234", full_name="Author", role="employee",
+        )
+        cls.post = make_post(cls.author, 1)
+        cls.other = make_post(cls.author, 2)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.reader)
+
+    def toggle(self, pk):
+        return self.api.post(f"/api/post/posts/{pk}/like/")
+
+    def test_toggle(self):
+        for liked, like_count in ((True, 1), (False, 0), (True, 1)):
+            response = self.toggle(self.post.pk)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((response.json()["liked"], response.json()["like_count"]), (liked, like_count))
+        self.assertEqual(Post.objects.get(pk=self.post.pk).like_count, 1)
+        self.assertEqual(Like.objects.filter(user=self.reader, post=self.post).count(), 1)
+
+    def test_missing_post(self):
+        response = self.toggle(self.other.pk + 100)
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Like.objects.exists())
+
+    def test_count_never_goes_negative(self):
+        # a like the counter missed, e.g. before a reconcile
+        Like.objects.create(user=self.reader, post=self.post)
+        response = self.toggle(self.post.pk)
+        self.assertEqual((response.json()["liked"], response.json()["like_count"]), (False, 0))
+
+        response = self.api.post("/api/post/posts/likes/batch/", {"actions": [
+            {"post": self.post.pk, "liked": False},
+        ]}, format="json")
+        self.assertEqual(response.json()["results"], [{"post": self.post.pk, "liked": False, "like_count": 0}])
+
+    def test_batch_reports_each_post(self):
+        Like.objects.create(user=self.reader, post=self.other)
+        missing = self.other.pk + 100
+        response = self.api.post("/api/post/posts/likes/batch/", {"actions": [
+            {"post": self.post.pk, "liked": True},
+            {"post": self.other.pk, "liked": True},
+            {"post": missing, "liked": True},
+            {"post": self.other.pk, "liked": False},  # the last action for a post wins
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [
+            {"post": self.post.pk, "liked": True, "like_count": 1},
+            {"post": self.other.pk, "liked": False, "like_count": 0},
+            {"post": missing, "error": "Post not found"},
+        ])
+        self.assertEqual(list(Like.objects.values_list("post", flat=True)), [self.post.pk])
+
+    def test_batch_rejects_bad_actions(self):
+        response = self.api.post("/api/post/posts/likes/batch/", {"actions": []}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------- Home feed ----------
+@override_settings(FEED_ENGINE_ENABLED=True, FEED_MAX_ENTRIES=4, FEED_HOT_AUTHOR_DAILY_POSTS=50)
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            email="reader@example.com", password="pass1234", full_name="Reader", role="employee",
+        )
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass1234", full_name="Author", role="employee",
+        )
+        FeedSubscriber.objects.create(user=cls.reader, last_read_at=timezone.now())
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(self.reader)
+
+    def read_all(self, page_size=2):
+        ids, url = [], f"/api/post/all-posts/?page_size={page_size}"
+        while url:
+            body = self.api.get(url).json()
+            ids += [post["id"] for post in body["results"]]
+            url = body["next"]
+        return ids
+
+    def test_fan_out_pushes_to_subscribers_but_not_the_author(self):
+        post = make_post(self.author, 1)
+        fan_out_post(post.id)
+        self.assertEqual(list(FeedEntry.objects.values_list("user_id", "post_id")), [(self.reader.id, post.id)])
+        self.assertEqual(FeedEntry.objects.get().published_at, post.created_at)
+        self.assertTrue(Post.objects.get(pk=post.pk).fanned_out)
+
+    def test_feed_keeps_only_the_newest_entries(self):
+        posts = [make_post(self.author, minutes) for minutes in range(6, 0, -1)]  # oldest first
+        for post in posts:
+            fan_out_post(post.id)
+        kept = FeedEntry.objects.filter(user=self.reader).order_by("-published_at")
+        self.assertEqual(list(kept.values_list("post_id", flat=True)), [post.id for post in posts[:-5:-1]])
+
+    def test_cursor_merges_pushed_and_pulled_posts(self):
+        posts = [make_post(self.author, minutes) for minutes in range(1, 8)]  # newest first
+        for post in posts[::2]:
+            fan_out_post(post.id)  # the others were published while fan-out was off
+
+        self.assertEqual(self.read_all(), [post.id for post in posts])
+
+        # an edit doesn't move the post on either side
+        self.api.force_authenticate(self.author)
+        for post in (posts[2], posts[3]):
+            self.api.put(f"/api/post/posts/{post.id}/", {"title": "Edited"}, format="multipart")
+        self.api.force_authenticate(self.reader)
+        self.assertEqual(self.read_all(page_size=3), [post.id for post in posts])
+
+
+# ---------- Upload metadata ----------
+class UploadMetadataTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass1234", full_name="Author", role="employee",
+        )
+
+    def upload(self, content, name="photo.jpg"):
+        api = APIClient()
+        api.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = api.post(
+                "/api/post/posts/", {"title": "Post", "post": SimpleUploadedFile(name, content)}, format="multipart",
+            )
+        self.assertEqual(response.status_code, 201, response.content)
+        return Post.objects.get(pk=response.json()["id"]).post.name
+
+    def test_original_is_stored_without_gps(self):
+        name = self.upload(make_jpeg(Make="Camera", GPSInfo={1: "N", 2: (10.0, 31.0, 0.0)}), name="photo.png")
+        self.assertTrue(name.endswith(".jpg"))  # extension from the bytes, not the client name
+        with default_storage.open(name) as fh:
+            stored = Image.open(fh)
+            self.assertEqual(dict(stored.getexif()), {})
+            self.assertEqual(stored.size, (40, 20))
+
+    def test_orientation_is_applied_before_stripping(self):
+        name = self.upload(make_jpeg(Orientation=6))
+        with default_storage.open(name) as fh:
+            stored = Image.open(fh)
+            self.assertEqual(dict(stored.getexif()), {})
+            self.assertEqual(stored.size, (20, 40))
+
+    def test_clean_images_are_stored_as_uploaded(self):
+        content = make_jpeg()
+        with default_storage.open(self.upload(content)) as fh:
+            self.assertEqual(fh.read(), content)
+
+    def test_variants_skip_non_images_without_opening_them(self):
+        name = default_storage.save("clip.mp4", ContentFile(b"\x00\x00\x00\x18ftypmp42" + bytes(64)))
+        self.assertTrue(name.endswith(".mp4"))
+        with mock.patch.object(default_storage, "open") as storage_open:
+            self.assertEqual(render_variants(default_storage, name), {})
+        storage_open.assert_not_called()
+
+
+# ---------- Uploads ----------
+class UploadTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass1234", full_name="Author", role="employee",
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.author)
+
+    def start(self, content, filename="photo.jpg"):
+        response = self.api.post("/api/post/posts/uploads/", {"filename": filename, "size": len(content)}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        return f"/api/post/posts/uploads/{response.json()['id']}/"
+
+    def send(self, url, chunk, offset):
+        return self.api.generic(
+            "PUT", url, chunk, content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def complete(self, url):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.api.post(f"{url}complete/", {"title": "Chunked"}, format="json")
+
+    def test_resume_after_a_partial_upload(self):
+        content = make_jpeg(size=(400, 300))
+        half = len(content) // 2
+        url = self.start(content)
+        self.assertEqual(self.send(url, content[:half], 0).json()["received"], half)
+
+        self.assertEqual(self.complete(url).status_code, 409)  # incomplete
+        self.assertEqual(self.api.get(url).json()["received"], half)  # where to resume from
+        self.assertEqual(self.send(url, content[half:], half).json()["received"], len(content))
+
+        created = self.complete(url)
+        self.assertEqual(created.status_code, 201, created.content)
+        session = UploadSession.objects.get()
+        self.assertEqual((session.status, session.post_id), (UploadSession.COMPLETE, created.json()["id"]))
+        self.assertFalse(os.path.exists(session.part_path))
+        with default_storage.open(Post.objects.get().post.name) as fh:
+            self.assertEqual(fh.read(), content)
+
+        again = self.complete(url)
+        self.assertEqual((again.status_code, again.json()["id"]), (200, created.json()["id"]))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_chunk_at_the_wrong_offset_conflicts(self):
+        content = make_jpeg()
+        url = self.start(content)
+        self.send(url, content[:100], 0)
+        for offset in (0, 50, 200):
+            response = self.send(url, content[100:150], offset)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()["received"], 100)
+
+    def test_first_chunk_is_sniffed(self):
+        content = b"MZ\x90\x00" + bytes(60)  # a Windows executable named .jpg
+        url = self.start(content)
+        self.assertEqual(self.send(url, content, 0).status_code, 415)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+    def test_single_request_upload_is_cut_off_past_the_cap(self):
+        with self.settings(POST_UPLOAD_MAX_BYTES=1024):
+            response = self.api.post(
+                "/api/post/posts/", {"title": "Big", "post": SimpleUploadedFile("big.jpg", make_jpeg() + bytes(4096))},
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Post.objects.exists())
+
+
+# ---------- Shared blobs ----------
+class FakeS3Client:
+    """Just enough of a boto3 S3 client for HashedS3Storage, kept in a dict."""
+
+    class exceptions:
+        class ClientError(Exception):
+            def __init__(self, code):
+                super().__init__(code)
+                self.response = {"Error": {"Code": code}}
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.ClientError("404")
+        return {"ContentLength": len(self.objects[Key]), "LastModified": timezone.now()}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.objects[key] = fileobj.read()
+        self.uploads += 1
+
+    def download_fileobj(self, bucket, key, fileobj):
+        fileobj.write(self.objects[key])
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+class MediaBlobTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com", password="pass1234", full_name="Author", role="employee",
+        )
+
+    def upload(self, content, name="photo.jpg"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(user=self.author, title="Post", post=SimpleUploadedFile(name, content))
+
+    def delete(self, post):
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+
+    def test_identical_uploads_share_one_blob(self):
+        content = make_jpeg()
+        first, second = self.upload(content, "a.jpg"), self.upload(content, "b.jpg")
+        self.assertEqual(first.post.name, second.post.name)
+        self.assertEqual(list(MediaBlob.objects.values_list("name", flat=True)), [first.post.name])
+        blob_dir = os.path.dirname(default_storage.path(first.post.name))
+        self.assertEqual(os.listdir(blob_dir), [os.path.basename(first.post.name)])
+
+    @override_settings(MEDIA_RELEASE_GRACE_SECONDS=0)
+    def test_blob_is_kept_while_another_row_uses_it(self):
+        content = make_jpeg()
+        first, second = self.upload(content), self.upload(content)
+        variants = list(derived_names(Post.objects.get(pk=first.pk).post_variants))
+        self.assertTrue(variants)
+
+        self.delete(first)
+        self.assertTrue(default_storage.exists(second.post.name))
+        self.assertTrue(all(default_storage.exists(name) for name in variants))
+
+        self.delete(second)
+        self.assertFalse(default_storage.exists(second.post.name))
+        self.assertFalse(any(default_storage.exists(name) for name in variants))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_release_right_after_a_reuse_waits_for_the_grace_period(self):
+        content = make_jpeg()
+        post = self.upload(content)
+        # an identical upload whose row hasn't committed yet
+        self.assertEqual(default_storage.save("again.jpg", ContentFile(content)), post.post.name)
+
+        self.delete(post)
+        self.assertTrue(default_storage.exists(post.post.name))
+        self.assertIsNotNone(MediaBlob.objects.get(name=post.post.name).release_requested_at)
+
+        call_command("release_media_blobs", stdout=StringIO())
+        self.assertTrue(default_storage.exists(post.post.name))  # still within the grace period
+        with self.settings(MEDIA_RELEASE_GRACE_SECONDS=0):
+            call_command("release_media_blobs", stdout=StringIO())
+        self.assertFalse(default_storage.exists(post.post.name))
+
+    def test_postponed_release_is_dropped_once_the_new_row_commits(self):
+        content = make_jpeg()
+        post = self.upload(content)
+        self.delete(post)
+        reused = self.upload(content)
+
+        with self.settings(MEDIA_RELEASE_GRACE_SECONDS=0):
+            call_command("release_media_blobs", stdout=StringIO())
+        self.assertTrue(default_storage.exists(reused.post.name))
+        self.assertIsNone(MediaBlob.objects.get(name=reused.post.name).release_requested_at)
+
+    @override_settings(MEDIA_RELEASE_GRACE_SECONDS=0)
+    def test_s3_backend(self):
+        client = FakeS3Client()
+        storage = HashedS3Storage(bucket="media", base_url="https://cdn.example.com/", client=client)
+        content = make_jpeg(Make="Camera")
+        name = storage.save("a.png", ContentFile(content))
+        self.assertEqual(storage.save("b.jpg", ContentFile(content)), name)
+        self.assertEqual(client.uploads, 1)
+        self.assertTrue(name.startswith("blobs/") and name.endswith(".jpg"))
+        self.assertEqual(storage.url(name), f"https://cdn.example.com/{name}")
+        with storage.open(name) as fh:
+            self.assertEqual(dict(Image.open(fh).getexif()), {})
+
+        post = Post.objects.create(user=self.author, title="Post", post=name)
+        self.assertFalse(release_file(storage, name))
+        self.assertTrue(storage.exists(name))
+        post.delete()
+        self.assertTrue(release_file(storage, name))
+        self.assertEqual(client.objects, {})
+
+
+# ---------- Media serving ----------
+class ServeMediaTests(TemporaryMediaMixin, TestCase):
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.name = default_storage.save("clip.webm", ContentFile(b"\x1a\x45\xdf\xa3" + self.content))
+        self.url = f"/media/{self.name}"
+
+    def test_unchanged_file_is_not_sent_again(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Cache-Control"], "public, max-age=31536000, immutable")
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response.headers["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        self.assertFalse(cached.content)
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=4-13")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers["Content-Range"], f"bytes 4-13/{len(self.content) + 4}")
+        self.assertEqual(b"".join(response.streaming_content), self.content[:10])
+
+        suffix = self.client.get(self.url, HTTP_RANGE="bytes=-6")
+        self.assertEqual(b"".join(suffix.streaming_content), self.content[-6:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=5000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response.headers["Content-Range"], f"bytes */{len(self.content) + 4}")
+
+    def test_empty_file_has_no_satisfiable_range(self):
+        self.assertIs(parse_range("bytes=-10", 0), False)
+        self.assertIs(parse_range("bytes=0-", 0), False)
+        name = default_storage.save("empty.txt", ContentFile(b""))
+        self.assertEqual(self.client.get(f"/media/{name}", HTTP_RANGE="bytes=-10").status_code, 416)
+
+    @override_settings(MEDIA_SENDFILE="nginx", MEDIA_ACCEL_PREFIX="/protected-media/")
+    def test_nginx_serves_the_bytes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.headers["X-Accel-Redirect"], f"/protected-media/{self.name}")
+        self.assertEqual(response.headers["Content-Type"], "video/webm")
+        self.assertFalse(response.content)
+
+    @override_settings(MEDIA_SENDFILE="sendfile")
+    def test_sendfile_serves_the_bytes(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.headers["X-Sendfile"], default_storage.path(self.name))
+        self.assertFalse(response.content)
@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import PostView, PostUpdateDeleteView, AllPostView, PostLikeView, CommentView , EmployeePostsByIdView
+from .views import PostView, PostUpdateDeleteView, AllPostView, PostLikeView, PostLikeBatchView, CommentView , EmployeePostsByIdView, UploadSessionView, UploadChunkView, UploadCompleteView
 
 urlpatterns = [
     path('posts/', PostView.as_view(), name='employee-posts'),
@@ -8,7 +8,11 @@ urlpatterns = [
     path('all-posts/', AllPostView.as_view(), name='all-posts'),
     path('posts/<int:pk>/like/', PostLikeView.as_view(), name='post-like'),
     path('posts/liked/', PostLikeView.as_view(), name='all-liked-post'),
+    path('posts/likes/batch/', PostLikeBatchView.as_view(), name='post-like-batch'),
     path('posts/<int:pk>/comments/', CommentView.as_view(), name='post-comments'),
     path('comments/<int:pk>/', CommentView.as_view(), name='comment-update-delete'),
+    path('posts/uploads/', UploadSessionView.as_view(), name='post-upload-start'),
+    path('posts/uploads/<uuid:upload_id>/', UploadChunkView.as_view(), name='post-upload-chunk'),
+    path('posts/uploads/<uuid:upload_id>/complete/', UploadCompleteView.as_view(), name='post-upload-complete'),
    
 ]
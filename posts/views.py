@@ -1,13 +1,27 @@
+import os
+import shutil
+import tempfile
+
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated , AllowAny
-from rest_framework.parsers import MultiPartParser
+from rest_framework.parsers import MultiPartParser, JSONParser
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
+from django.core.files import File
+from django.db import transaction, IntegrityError
+from django.db.models import F
+from django.conf import settings
+from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from .models import Post, Like, Comment
-from .serializers import PostSerializer, CommentSerializer
+from .models import Post, Like, Comment, UploadSession
+from .serializers import (
+    PostSerializer, CommentSerializer, LikeBatchSerializer,
+    UploadInitSerializer, UploadCompleteSerializer, UploadSessionSerializer,
+)
+from .feed import FeedPagination, schedule_fan_out
+from helpers.pagination import KeysetPagination
+from helpers.uploads import MaxSizeUploadHandler, SNIFF_BYTES, copy_stream, sniff_content_type
 
 
 # ------------------ Employee Post APIs ------------------
@@ -22,32 +36,42 @@ class PostView(APIView):
     @swagger_auto_schema(
         tags=["Posts"],
         operation_summary="Get Employee's Posts",
-        operation_description="Retrieve all posts created by the authenticated employee.",
+        operation_description="Retrieve posts created by the authenticated employee, newest first. "
+                              "Cursor paginated: follow `next` to get the following page.",
         responses={200: PostSerializer(many=True)}
     )
     def get(self, request):
-        posts = Post.objects.filter(user=request.user).select_related('user').prefetch_related('likes', 'comments')
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination()
+        posts = Post.objects.filter(user=request.user).with_viewer(request.user).select_related('user')
+        result_page = paginator.paginate_queryset(posts, request)
+        serializer = PostSerializer(result_page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
         tags=["Posts"],
         operation_summary="Create Post",
         operation_description="Create a new post. Only employees are allowed to create posts. "
-                              "Upload files in 'post' field and add optional title & description.",
+                              "Upload files in 'post' field and add optional title & description. "
+                              "Files over POST_UPLOAD_MAX_BYTES are rejected; use the chunked upload "
+                              "endpoints (`posts/uploads/`) for large media.",
         request_body=PostSerializer,
         responses={
             201: PostSerializer,
             400: "Invalid data",
-            403: "Only employees can create posts"
+            403: "Only employees can create posts",
+            413: "File is too large"
         }
     )
     def post(self, request):
         if request.user.role != 'employee':
             return Response({"error": "Only employees can create posts"}, status=status.HTTP_403_FORBIDDEN)
-        serializer = PostSerializer(data=request.data)
+        # Stop reading the body once it passes the size cap (413)
+        request.upload_handlers.insert(0, MaxSizeUploadHandler(request))
+        serializer = PostSerializer(data=request.data, context={'viewer': request.user})
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            post = serializer.save(user=request.user)
+            if settings.FEED_ENGINE_ENABLED:
+                schedule_fan_out(post)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -61,7 +85,7 @@ class PostUpdateDeleteView(APIView):
 
     def get_post(self, pk):
         try:
-            return Post.objects.get(pk=pk, user=self.request.user)
+            return Post.objects.with_viewer(self.request.user).get(pk=pk, user=self.request.user)
         except Post.DoesNotExist:
             return None
 
@@ -75,7 +99,7 @@ class PostUpdateDeleteView(APIView):
         post = self.get_post(pk)
         if not post:
             return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = PostSerializer(post)
+        serializer = PostSerializer(post, context={'image_variant': 'full'})
         return Response(serializer.data)
 
     @swagger_auto_schema(
@@ -89,6 +113,7 @@ class PostUpdateDeleteView(APIView):
         post = self.get_post(pk)
         if not post:
             return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+        request.upload_handlers.insert(0, MaxSizeUploadHandler(request))
         serializer = PostSerializer(post, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
@@ -121,39 +146,57 @@ class EmployeePostsByIdView(APIView):
     @swagger_auto_schema(
         tags=["Posts"],
         operation_summary="Get All Posts by Specific Employee",
-        operation_description="Retrieve all posts created by a specific employee using their employee ID.",
+        operation_description="Retrieve posts created by a specific employee using their employee ID, newest first. "
+                              "Cursor paginated: follow `next` to get the following page.",
         manual_parameters=[
             openapi.Parameter('employee_id', openapi.IN_PATH, description="Employee ID", type=openapi.TYPE_INTEGER)
         ],
         responses={200: PostSerializer(many=True), 404: "Employee not found or has no posts"}
     )
     def get(self, request, employee_id):
-        posts = Post.objects.filter(user_id=employee_id).select_related('user').prefetch_related('likes', 'comments')
-        if not posts.exists():
+        paginator = KeysetPagination()
+        posts = Post.objects.filter(user_id=employee_id).with_viewer(request.user).select_related('user')
+        result_page = paginator.paginate_queryset(posts, request)
+        if not result_page and not request.query_params.get(paginator.cursor_query_param):
             return Response({"error": "No posts found for this employee"}, status=status.HTTP_404_NOT_FOUND)
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = PostSerializer(result_page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class PopularPostPagination(KeysetPagination):
+    ordering = ('-like_count', '-id')
 
 
 # ------------------ All Posts View (Paginated) ------------------
 class AllPostView(APIView):
     """
-    Retrieve all posts from other employees, paginated.
+    Retrieve all posts from other employees, cursor paginated.
     """
     permission_classes = [IsAuthenticated]
 
     @swagger_auto_schema(
         tags=["Posts"],
         operation_summary="Get All Employee Posts (Paginated)",
-        operation_description="Retrieve all posts from other employees, excluding authenticated user's posts. "
-                              "Results are paginated with 5 posts per page.",
+        operation_description="Retrieve all posts from other employees, excluding authenticated user's posts, newest first "
+                              "(or most liked first with `sort=popular`). "
+                              "Results are cursor paginated with 5 posts per page: follow `next` to get the following page.",
+        manual_parameters=[
+            openapi.Parameter('sort', openapi.IN_QUERY, description="`recent` (default) or `popular`", type=openapi.TYPE_STRING)
+        ],
         responses={200: PostSerializer(many=True)}
     )
     def get(self, request):
-        paginator = PageNumberPagination()
-        paginator.page_size = 5
-        posts = Post.objects.exclude(user=request.user).select_related('user').prefetch_related('likes', 'comments')
-        result_page = paginator.paginate_queryset(posts, request)
+        sort = request.query_params.get('sort')
+        if sort != 'popular' and settings.FEED_ENGINE_ENABLED:
+            # Precomputed feed, see posts/feed.py
+            paginator = FeedPagination()
+            paginator.page_size = 5
+            result_page = paginator.paginate_feed(request.user, request)
+        else:
+            paginator = PopularPostPagination() if sort == 'popular' else KeysetPagination()
+            paginator.page_size = 5
+            posts = Post.objects.exclude(user=request.user).with_viewer(request.user).select_related('user')
+            result_page = paginator.paginate_queryset(posts, request)
         serializer = PostSerializer(result_page, many=True)
         return paginator.get_paginated_response(serializer.data)
 
@@ -169,38 +212,109 @@ class PostLikeView(APIView):
         tags=["Likes"],
         operation_summary="Like / Unlike Post",
         operation_description="Like a post if not already liked. Unlike if already liked. "
-                              "Users cannot like their own posts.",
-        responses={200: "Post liked/unliked", 403: "Cannot like own post", 404: "Post not found"}
+                              "Returns the new like state and the post's like count.",
+        responses={200: "Post liked/unliked", 404: "Post not found"}
     )
     def post(self, request, pk):
-        try:
-            post = Post.objects.get(pk=pk)
-        except Post.DoesNotExist:
-            return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
-
         # if post.user == request.user:
         #     return Response({"error": "Cannot like your own post"}, status=status.HTTP_403_FORBIDDEN)
 
-        like = Like.objects.filter(user=request.user, post=post).first()
-        if like:
-            like.delete()
-            return Response({"msg": "Post unliked"})
-        Like.objects.create(user=request.user, post=post)
-        return Response({"msg": "Post liked"})
+        # Insert first and let the unique (user, post) constraint decide: a
+        # conflict means the post was already liked, so it becomes an unlike.
+        # Both paths touch the like row before the post row, so concurrent
+        # taps can't deadlock or double count.
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    Like.objects.create(user=request.user, post_id=pk)
+                liked, delta = True, 1
+            except IntegrityError:
+                deleted, _ = Like.objects.filter(user=request.user, post_id=pk).delete()
+                liked, delta = False, -deleted
+
+            if liked:
+                if not Post.objects.filter(pk=pk).update(like_count=F('like_count') + 1):
+                    # Nothing to increment: the post doesn't exist
+                    transaction.set_rollback(True)
+                    return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+            elif delta:
+                Post.objects.filter(pk=pk, like_count__gt=0).update(like_count=F('like_count') + delta)
+
+            like_count = Post.objects.filter(pk=pk).values_list('like_count', flat=True).first()
+
+        if like_count is None:
+            return Response({"error": "Post not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            "msg": "Post liked" if liked else "Post unliked",
+            "liked": liked,
+            "like_count": like_count,
+        })
     
     @swagger_auto_schema(
         tags=["Likes"],
         operation_summary="Get All Liked Posts by User",
-        operation_description="Retrieve all posts that the authenticated user has liked.",
+        operation_description="Retrieve posts that the authenticated user has liked, newest first. "
+                              "Cursor paginated: follow `next` to get the following page. "
+                              "Post listings already carry `is_liked_by_me`, so this isn't needed to render like state.",
         responses={200: PostSerializer(many=True)}
     )
     def get(self, request):
-        liked_posts = Post.objects.filter(likes__user=request.user).select_related('user').prefetch_related('likes', 'comments')
-        serializer = PostSerializer(liked_posts, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination()
+        liked_posts = Post.objects.filter(likes__user=request.user).with_viewer(request.user).select_related('user')
+        result_page = paginator.paginate_queryset(liked_posts, request)
+        serializer = PostSerializer(result_page, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
     
 
+# ------------------ Batch Like / Unlike ------------------
+class PostLikeBatchView(APIView):
+    """
+    Apply a queue of like / unlike actions in one request.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        tags=["Likes"],
+        operation_summary="Batch Like / Unlike Posts",
+        operation_description="Set the like state of several posts at once, e.g. when a mobile client flushes "
+                              "its offline queue. Each action is `{post, liked}`; when a post appears more than "
+                              "once the last action wins. Returns the final state and like count per post.",
+        request_body=LikeBatchSerializer,
+        responses={200: "Per-post results", 400: "Invalid data"}
+    )
+    def post(self, request):
+        serializer = LikeBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        wanted = {}
+        for action in serializer.validated_data['actions']:
+            wanted[action['post']] = action['liked']
+
+        with transaction.atomic():
+            existing = set(Post.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+            like_ids = [pk for pk, liked in wanted.items() if liked and pk in existing]
+            unlike_ids = [pk for pk, liked in wanted.items() if not liked and pk in existing]
+
+            Like.objects.bulk_create(
+                [Like(user=request.user, post_id=pk) for pk in like_ids], ignore_conflicts=True
+            )
+            Like.objects.filter(user=request.user, post_id__in=unlike_ids).delete()
+            # Set-based recount of the touched posts stays exact even if other
+            # likes land concurrently, unlike per-post +1/-1 guesses
+            Post.objects.filter(pk__in=existing).recount(fields=('like_count',))
+            counts = dict(Post.objects.filter(pk__in=existing).values_list('pk', 'like_count'))
+
+        results = []
+        for pk, liked in wanted.items():
+            if pk in existing:
+                results.append({"post": pk, "liked": liked, "like_count": counts[pk]})
+            else:
+                results.append({"post": pk, "error": "Post not found"})
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
 # ------------------ Comment APIs a post  Retrieve all comment, Update & Delete Single Comment ------------------
 class CommentView(APIView):
     """
@@ -211,13 +325,16 @@ class CommentView(APIView):
     @swagger_auto_schema(
         tags=["Comments"],
         operation_summary="Get Comments",
-        operation_description="Retrieve all comments for a specific post, ordered by newest first.",
+        operation_description="Retrieve comments for a specific post, ordered by newest first. "
+                              "Cursor paginated: follow `next` to get the following page.",
         responses={200: CommentSerializer(many=True)}
     )
     def get(self, request, pk):
-        comments = Comment.objects.filter(post__pk=pk).select_related('user').order_by("-created_at")
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        paginator = KeysetPagination()
+        comments = Comment.objects.filter(post_id=pk).select_related('user')
+        result_page = paginator.paginate_queryset(comments, request)
+        serializer = CommentSerializer(result_page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
         tags=["Comments"],
@@ -243,7 +360,9 @@ class CommentView(APIView):
 
         serializer = CommentSerializer(data={'post': post.id, 'text': request.data.get('text')})
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            with transaction.atomic():
+                serializer.save(user=request.user)
+                Post.objects.filter(pk=post.pk).update(comment_count=F('comment_count') + 1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -289,29 +408,222 @@ class CommentView(APIView):
             return Response({"error": "Comment not found"}, status=status.HTTP_404_NOT_FOUND)
         if comment.user != request.user:
             return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            Post.objects.filter(pk=comment.post_id, comment_count__gt=0).update(comment_count=F('comment_count') - 1)
         return Response({"message": "Comment deleted"}, status=status.HTTP_204_NO_CONTENT)
 
 
+# ------------------ Chunked (resumable) Post Uploads ------------------
+def get_upload_session(request, upload_id):
+    try:
+        return UploadSession.objects.get(pk=upload_id, user=request.user)
+    except UploadSession.DoesNotExist:
+        return None
 
 
+class UploadSessionView(APIView):
+    """
+    Start a resumable upload for a large post file.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser]
 
+    @swagger_auto_schema(
+        tags=["Uploads"],
+        operation_summary="Start Chunked Upload",
+        operation_description="Declare the file name and total size of a post file. Then PUT its bytes in order "
+                              "to `posts/uploads/<id>/` with an `Upload-Offset` header, and finish with "
+                              "`posts/uploads/<id>/complete/`. Only employees can upload.",
+        request_body=UploadInitSerializer,
+        responses={201: UploadSessionSerializer, 400: "Invalid data", 403: "Only employees can create posts"}
+    )
+    def post(self, request):
+        if request.user.role != 'employee':
+            return Response({"error": "Only employees can create posts"}, status=status.HTTP_403_FORBIDDEN)
+        serializer = UploadInitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        session = UploadSession.objects.create(
+            user=request.user,
+            filename=os.path.basename(serializer.validated_data['filename']),
+            size=serializer.validated_data['size'],
+        )
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class UploadChunkView(APIView):
+    """
+    Inspect, append to, or abort a resumable upload.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = []  # the body is read as a raw stream, never buffered by a parser
 
+    @swagger_auto_schema(
+        tags=["Uploads"],
+        operation_summary="Get Upload Status",
+        operation_description="Return the upload's state. `received` is the offset to resume from.",
+        responses={200: UploadSessionSerializer, 404: "Upload not found"}
+    )
+    def get(self, request, upload_id):
+        session = get_upload_session(request, upload_id)
+        if not session:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UploadSessionSerializer(session).data)
 
+    @swagger_auto_schema(
+        tags=["Uploads"],
+        operation_summary="Upload Chunk",
+        operation_description="Append the raw request body at the `Upload-Offset` header, which must equal "
+                              "`received`. Chunks are at most `chunk_size` bytes. The file type is detected "
+                              "from the first chunk's content.",
+        manual_parameters=[
+            openapi.Parameter('Upload-Offset', openapi.IN_HEADER, description="Byte offset of this chunk", type=openapi.TYPE_INTEGER, required=True)
+        ],
+        responses={
+            200: UploadSessionSerializer,
+            400: "Missing offset or incomplete chunk",
+            404: "Upload not found",
+            409: "Offset mismatch or upload already completed",
+            413: "Chunk too large",
+            415: "Unsupported file type"
+        }
+    )
+    def put(self, request, upload_id):
+        session = get_upload_session(request, upload_id)
+        if not session:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            offset = int(request.META['HTTP_UPLOAD_OFFSET'])
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except (KeyError, ValueError):
+            return Response({"error": "A numeric Upload-Offset header is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({"error": "Empty chunk"}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_CHUNK_MAX_BYTES or offset + length > session.size:
+            return Response({"error": "Chunk too large"}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if session.status != UploadSession.OPEN or offset != session.received:
+            return Response(
+                {"error": "Offset mismatch", "received": session.received, "status": session.status},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        # Spool the chunk next to the partial file first, so the row lock
+        # below is held for a local copy rather than for the client's upload
+        os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=settings.UPLOAD_SESSION_DIR, suffix='.chunk') as chunk:
+            if copy_stream(request.stream, chunk, length) != length:
+                return Response({"error": "Incomplete chunk"}, status=status.HTTP_400_BAD_REQUEST)
+            content_type = session.content_type
+            if offset == 0:
+                chunk.seek(0)
+                content_type = sniff_content_type(chunk.read(SNIFF_BYTES))
+                if content_type is None:
+                    return Response({"error": "Unsupported file type"}, status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+            with transaction.atomic():
+                session = UploadSession.objects.select_for_update().get(pk=session.pk)
+                if session.status != UploadSession.OPEN or offset != session.received:
+                    # a concurrent retry of the same chunk won the race
+                    return Response(
+                        {"error": "Offset mismatch", "received": session.received, "status": session.status},
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                chunk.seek(0)
+                with open(session.part_path, 'r+b' if offset else 'wb') as part:
+                    part.seek(offset)
+                    part.truncate()  # drop bytes of an append that failed half way
+                    shutil.copyfileobj(chunk, part)
+                session.received = offset + length
+                session.content_type = content_type
+                session.save(update_fields=['received', 'content_type', 'updated_at'])
+
+        return Response(UploadSessionSerializer(session).data)
 
+    @swagger_auto_schema(
+        tags=["Uploads"],
+        operation_summary="Abort Upload",
+        operation_description="Abort an open upload and discard the bytes received so far.",
+        responses={204: "Upload aborted", 404: "Upload not found"}
+    )
+    def delete(self, request, upload_id):
+        session = get_upload_session(request, upload_id)
+        if not session:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        if session.status == UploadSession.OPEN:
+            session.discard_part()
+        session.delete()
+        return Response({"message": "Upload aborted"}, status=status.HTTP_204_NO_CONTENT)
 
 
+class UploadCompleteView(APIView):
+    """
+    Turn a fully received upload into a post.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser]
 
-
-
-
-
-
-
-
-
-
-
-
-
-
+    @swagger_auto_schema(
+        tags=["Uploads"],
+        operation_summary="Complete Chunked Upload",
+        operation_description="Create the post from a fully received upload, with optional title & description. "
+                              "Calling it again returns the same post.",
+        request_body=UploadCompleteSerializer,
+        responses={
+            201: PostSerializer,
+            200: PostSerializer,
+            400: "Invalid data",
+            404: "Upload not found",
+            409: "Upload is incomplete, or completed but its post was deleted"
+        }
+    )
+    def post(self, request, upload_id):
+        session = get_upload_session(request, upload_id)
+        if not session:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = UploadCompleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if session.status == UploadSession.COMPLETE:
+            return self.completed(request, session)
+        if session.received != session.size:
+            return Response(
+                {"error": "Upload is incomplete", "received": session.received, "size": session.size},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        # Move the file into media storage before touching the session row.
+        # Storage is content addressed, so a concurrent retry writes the same blob.
+        post = Post(user=request.user, **serializer.validated_data)
+        try:
+            with open(session.part_path, 'rb') as part:
+                post.post.save(session.filename, File(part), save=False)
+        except FileNotFoundError:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        with transaction.atomic():
+            post.save()
+            completed = UploadSession.objects.filter(pk=session.pk, status=UploadSession.OPEN).update(
+                status=UploadSession.COMPLETE, post=post, updated_at=timezone.now(),
+            )
+            if completed:
+                transaction.on_commit(session.discard_part)
+                if settings.FEED_ENGINE_ENABLED:
+                    schedule_fan_out(post)
+            else:
+                transaction.set_rollback(True)  # a concurrent call completed it first
+
+        if not completed:
+            session = UploadSession.objects.filter(pk=session.pk).first()
+            if not session:
+                return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+            return self.completed(request, session)
+        return Response(PostSerializer(post, context={'viewer': request.user}).data, status=status.HTTP_201_CREATED)
+
+    def completed(self, request, session):
+        """The post an already completed upload turned into."""
+        if not session.post_id:
+            return Response({"error": "Upload already completed"}, status=status.HTTP_409_CONFLICT)
+        post = Post.objects.with_viewer(request.user).get(pk=session.post_id)
+        return Response(PostSerializer(post, context={'viewer': request.user}).data, status=status.HTTP_200_OK)